@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.utils.html import format_html
 from django.db.models import Avg, Count
 from .models import Service, Event, EventGallery, Review,EventService
+from utils.images import variant_urls
 
 class ServiceAdmin(admin.ModelAdmin):
     list_display = ('id', 'get_name_display', 'event_count', 'active_event_count') 
@@ -34,7 +35,8 @@ class EventGalleryInline(admin.TabularInline):
     
     def preview_image(self, obj):
         if obj.image:
-            return format_html('<img src="{}" width="100" height="auto" />', obj.image.url)
+            url = variant_urls(None, obj.image_variants).get('thumb', obj.image.url)
+            return format_html('<img src="{}" width="100" height="auto" />', url)
         return "-"
     preview_image.short_description = 'Preview'
 
@@ -130,7 +132,8 @@ class EventAdmin(admin.ModelAdmin):
 
     def logo_preview(self, obj):
         if obj.logo:
-            return format_html('<img src="{}" width="100" height="auto" />', obj.logo.url)
+            url = variant_urls(None, obj.logo_variants).get('thumb', obj.logo.url)
+            return format_html('<img src="{}" width="100" height="auto" />', url)
         return "-"
     logo_preview.short_description = 'Logo Preview'
 
@@ -161,7 +164,8 @@ class EventGalleryAdmin(admin.ModelAdmin):
 
     def preview_image(self, obj):
         if obj.image:
-            return format_html('<img src="{}" style="max-width:60px; height:auto;" />', obj.image.url)
+            url = variant_urls(None, obj.image_variants).get('thumb', obj.image.url)
+            return format_html('<img src="{}" style="max-width:60px; height:auto;" />', url)
         return "-"
     preview_image.short_description = 'Preview'
 
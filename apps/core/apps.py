@@ -4,5 +4,6 @@ class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.core' 
     verbose_name = 'Core'
-    
-    
\ No newline at end of file
+
+    def ready(self):
+        from . import signals  # noqa: F401
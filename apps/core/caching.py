@@ -0,0 +1,44 @@
+import uuid
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from utils.images import STATUS_PENDING, STATUS_PROCESSING
+
+
+def _cache():
+    return caches[getattr(settings, 'SELLER_EVENTS_CACHE', 'default')]
+
+
+def seller_events_version(user_id):
+    """Token that changes whenever one of the seller's events, galleries, services or reviews does"""
+    return _cache().get_or_set(f"seller-events-version:{user_id}", lambda: uuid.uuid4().hex, None)
+
+
+def invalidate_seller_events(user_id):
+    # Again on commit, so a read between the write and the commit can't cache the old rows
+    def invalidate():
+        _cache().delete(f"seller-events-version:{user_id}")
+
+    invalidate()
+    transaction.on_commit(invalidate)
+
+
+def get_seller_events(user_id, version, base_url):
+    return _cache().get(f"seller-events:{user_id}:{version}:{base_url}")
+
+
+def cache_seller_events(user_id, version, base_url, data):
+    """
+    Keep serialized events unless an image is still being processed: variant
+    processing updates rows without signals, so those responses would go stale.
+    """
+    in_progress = (STATUS_PENDING, STATUS_PROCESSING)
+    for event in data:
+        if event['logo_status'] in in_progress or any(
+            image['image_status'] in in_progress for image in event['gallery_images']
+        ):
+            return
+    _cache().set(
+        f"seller-events:{user_id}:{version}:{base_url}", data,
+        getattr(settings, 'SELLER_EVENTS_CACHE_TTL', 300)
+    )
@@ -0,0 +1,53 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+from apps.core.models import Event, EventGallery, LOGO_VARIANT_SIZES, GALLERY_VARIANT_SIZES
+from apps.users.models import User, PROFILE_IMAGE_VARIANT_SIZES
+from utils.images import process_variants, STATUS_READY, STATUS_PROCESSING
+
+TARGETS = [
+    (Event, 'logo', LOGO_VARIANT_SIZES),
+    (EventGallery, 'image', GALLERY_VARIANT_SIZES),
+    (User, 'profile_image', PROFILE_IMAGE_VARIANT_SIZES),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Build resized image variants and placeholders for logos, gallery images and profile "
+        "images that are still pending, failed, stuck processing after their worker died, "
+        "or were uploaded before they existed"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Rebuild variants even if they are ready")
+        parser.add_argument(
+            '--stale-minutes', type=int, default=getattr(settings, 'IMAGE_PROCESSING_STALE_MINUTES', 30),
+            help="Redo images that have been processing for longer than this",
+        )
+
+    def handle(self, *args, **options):
+        stale_before = timezone.now() - timedelta(minutes=options['stale_minutes'])
+        for model, image_field, sizes in TARGETS:
+            status_field = f'{image_field}_status'
+            queryset = model.objects.exclude(**{image_field: ''}).exclude(**{f'{image_field}__isnull': True})
+            if not options['force']:
+                # Rows a pool worker is busy with are left alone unless forced or stale
+                outstanding = ~Q(**{f'{status_field}__in': [STATUS_READY, STATUS_PROCESSING]})
+                since = f'{image_field}_processing_since'
+                outstanding |= Q(**{status_field: STATUS_PROCESSING}) & (
+                    Q(**{f'{since}__lt': stale_before}) | Q(**{f'{since}__isnull': True})
+                )
+                if hasattr(model, f'{image_field}_placeholder'):
+                    # Images processed before placeholders existed
+                    outstanding |= Q(**{status_field: STATUS_READY, f'{image_field}_placeholder': ''})
+                queryset = queryset.filter(outstanding)
+
+            processed = 0
+            for pk in list(queryset.values_list('pk', flat=True)):
+                process_variants(model, pk, image_field, sizes)
+                processed += 1
+
+            self.stdout.write(self.style.SUCCESS(f"{model.__name__}.{image_field}: processed {processed} images"))
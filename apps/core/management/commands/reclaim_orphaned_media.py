@@ -0,0 +1,112 @@
+import os
+import time
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from apps.core.models import Event, EventGallery, ChunkedUpload, MediaBlob
+from apps.core.uploads import discard_upload
+from apps.users.models import User
+
+IMAGE_FIELDS = [
+    (Event, 'logo'),
+    (EventGallery, 'image'),
+    (User, 'profile_image'),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete files under MEDIA_ROOT that no database row references, and chunked uploads "
+        "that were never finished. Files are checked in batches, so memory use stays flat "
+        "however large the media tree is."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Only list what would be deleted")
+        parser.add_argument(
+            '--min-age', type=int, default=24,
+            help="Leave files younger than this many hours alone (uploads still in flight)"
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        self.dry_run = options['dry_run']
+        cutoff = time.time() - options['min_age'] * 3600
+
+        reclaimed = reclaimed_bytes = 0
+        batch = []
+        for name, size in self.walk(settings.MEDIA_ROOT, cutoff):
+            batch.append((name, size))
+            if len(batch) >= options['batch_size']:
+                count, freed = self.reclaim(batch)
+                reclaimed, reclaimed_bytes = reclaimed + count, reclaimed_bytes + freed
+                batch = []
+        if batch:
+            count, freed = self.reclaim(batch)
+            reclaimed, reclaimed_bytes = reclaimed + count, reclaimed_bytes + freed
+
+        stale_uploads = self.purge_chunked_uploads(cutoff, options['min_age'])
+
+        verb = "Would reclaim" if self.dry_run else "Reclaimed"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {reclaimed} orphaned media files ({reclaimed_bytes} bytes) and {stale_uploads} stale chunked uploads"
+        ))
+
+    def walk(self, root, cutoff):
+        """Yield (storage name, size) for every file old enough to be considered"""
+        for directory, _, filenames in os.walk(root):
+            for filename in filenames:
+                path = os.path.join(directory, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                if stat.st_mtime < cutoff:
+                    yield os.path.relpath(path, root).replace(os.sep, '/'), stat.st_size
+
+    def live_names(self, names):
+        live = set(MediaBlob.objects.filter(name__in=names, ref_count__gt=0).values_list('name', flat=True))
+        for model, field in IMAGE_FIELDS:
+            live.update(model.objects.filter(**{f'{field}__in': names}).values_list(field, flat=True))
+        return live
+
+    def reclaim(self, batch):
+        live = self.live_names([name for name, _ in batch])
+        orphans = [(name, size) for name, size in batch if name not in live]
+
+        for name, _ in orphans:
+            self.stdout.write(f"{'would delete' if self.dry_run else 'deleting'} {name}")
+            if not self.dry_run:
+                try:
+                    os.remove(os.path.join(settings.MEDIA_ROOT, name))
+                except FileNotFoundError:
+                    pass
+        if orphans and not self.dry_run:
+            MediaBlob.objects.filter(name__in=[name for name, _ in orphans]).delete()
+
+        return len(orphans), sum(size for _, size in orphans)
+
+    def purge_chunked_uploads(self, cutoff, min_age):
+        stale = ChunkedUpload.objects.filter(updated_at__lt=timezone.now() - timedelta(hours=min_age))
+        count = 0
+        for upload in list(stale):
+            count += 1
+            if not self.dry_run:
+                discard_upload(upload)
+
+        # Temp files whose upload row is already gone
+        root = settings.CHUNKED_UPLOAD_ROOT
+        if os.path.isdir(root):
+            for entry in os.scandir(root):
+                if entry.is_file() and entry.stat().st_mtime < cutoff:
+                    try:
+                        known = ChunkedUpload.objects.filter(pk=uuid.UUID(entry.name)).exists()
+                    except ValueError:
+                        known = False
+                    if not known:
+                        count += 1
+                        if not self.dry_run:
+                            os.remove(entry.path)
+        return count
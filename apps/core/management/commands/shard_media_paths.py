@@ -0,0 +1,141 @@
+import os
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from apps.core.models import Event, EventGallery
+from apps.users.authentication import invalidate_cached_user
+from apps.users.models import User
+from utils.storage import SHARD_SUFFIX, CONTENT_ADDRESSED_NAME, delete_files_on_commit
+
+IMAGE_FIELDS = [
+    (Event, 'logo'),
+    (EventGallery, 'image'),
+    (User, 'profile_image'),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Move media stored under the old flat or per-name paths (e.g. profiles/<first name>/) "
+        "into the sharded <upload dir>/ab/cd/<sha256> layout and rewrite the stored paths in bulk"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Only list the files that would move")
+        parser.add_argument('--batch-size', type=int, default=200)
+
+    def handle(self, *args, **options):
+        self.dry_run = options['dry_run']
+        # Old name -> new name for this run, so files shared by several rows move once
+        self.moved = {}
+
+        for model, image_field in IMAGE_FIELDS:
+            variants_field = f'{image_field}_variants'
+            queryset = (
+                model.objects.exclude(**{image_field: ''}).exclude(**{f'{image_field}__isnull': True})
+                .only('pk', image_field, variants_field).order_by('pk')
+            )
+            relocated = 0
+            batch = []
+            for instance in queryset.iterator(chunk_size=options['batch_size']):
+                if self.relocate(instance, image_field):
+                    batch.append(instance)
+                if len(batch) >= options['batch_size']:
+                    relocated += self.save_batch(model, batch, image_field)
+                    batch = []
+            if batch:
+                relocated += self.save_batch(model, batch, image_field)
+
+            verb = "would move" if self.dry_run else "moved"
+            self.stdout.write(self.style.SUCCESS(f"{model.__name__}.{image_field}: {verb} files of {relocated} rows"))
+
+        if not self.dry_run:
+            self.remove_empty_directories(default_storage)
+
+    def remove_empty_directories(self, storage):
+        """Drop the old per-name folders the moved files leave behind"""
+        directories = {os.path.dirname(name) for name in self.moved if os.path.dirname(name)}
+        for directory in sorted(directories, key=len, reverse=True):
+            try:
+                os.rmdir(storage.path(directory))
+            except OSError:
+                # Not empty, or already gone
+                pass
+
+    def target_name(self, instance, image_field, name):
+        """The content-addressed name `name` should have under the field's current upload_to"""
+        field = instance._meta.get_field(image_field)
+        storage = field.storage
+        upload_name = field.generate_filename(instance, os.path.basename(name))
+        expected_directory = os.path.dirname(upload_name)
+        if CONTENT_ADDRESSED_NAME.search(name) and SHARD_SUFFIX.sub('', os.path.dirname(name)) == expected_directory:
+            return name
+        with storage.open(name, 'rb') as content:
+            return storage.hashed_name(upload_name, content)
+
+    def move(self, instance, image_field, name):
+        """Copy name to its sharded location and return the new name; the old file goes on commit"""
+        if name in self.moved:
+            return self.moved[name]
+        new_name = self.target_name(instance, image_field, name)
+        if new_name != name:
+            self.stdout.write(f"{'would move' if self.dry_run else 'moving'} {name} -> {new_name}")
+            storage = instance._meta.get_field(image_field).storage
+            if not self.dry_run and not storage.exists(new_name):
+                with storage.open(name, 'rb') as content:
+                    # Storage may pick another name; the rows must point at the file actually written
+                    new_name = storage._save(new_name, File(content))
+            self.moved[name] = new_name
+        return new_name
+
+    def relocate(self, instance, image_field):
+        """Point instance at sharded copies of its image and variants; True if anything changed"""
+        field_file = getattr(instance, image_field)
+        variants_field = f'{image_field}_variants'
+        old_names, new_names = [], []
+        try:
+            new_name = self.move(instance, image_field, field_file.name)
+            variants = dict(getattr(instance, variants_field) or {})
+            for label, variant in variants.items():
+                if label == 'source':
+                    continue
+                new_variant_name = self.move(instance, image_field, variant['name'])
+                if new_variant_name != variant['name']:
+                    old_names.append(variant['name'])
+                    new_names.append(new_variant_name)
+                    variants[label] = {**variant, 'name': new_variant_name}
+        except FileNotFoundError as e:
+            self.stderr.write(f"Skipping {instance._meta.label} {instance.pk}: {str(e)}")
+            return False
+
+        if new_name != field_file.name:
+            old_names.append(field_file.name)
+            new_names.append(new_name)
+            if variants.get('source') == field_file.name:
+                variants['source'] = new_name
+        if not old_names:
+            return False
+
+        setattr(instance, image_field, new_name)
+        setattr(instance, variants_field, variants)
+        instance._media_names = (old_names, new_names)
+        return True
+
+    def save_batch(self, model, batch, image_field):
+        if self.dry_run:
+            return len(batch)
+        storage = model._meta.get_field(image_field).storage
+        with transaction.atomic():
+            model.objects.bulk_update(batch, [image_field, f'{image_field}_variants'])
+            for instance in batch:
+                old_names, new_names = instance._media_names
+                for name in new_names:
+                    storage._add_reference(name)
+                # Old files disappear only once the rows no longer point at them
+                delete_files_on_commit(old_names, storage)
+            if model is User:
+                # bulk_update sends no post_save, and cached users still point at the old files
+                for instance in batch:
+                    invalidate_cached_user(instance.pk)
+        return len(batch)
@@ -0,0 +1,65 @@
+from django.db import migrations
+
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS core_review_fts
+    USING fts5(comment, content='core_review', content_rowid='id')
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS core_review_fts_ai AFTER INSERT ON core_review BEGIN
+        INSERT INTO core_review_fts(rowid, comment) VALUES (new.id, new.comment);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS core_review_fts_ad AFTER DELETE ON core_review BEGIN
+        INSERT INTO core_review_fts(core_review_fts, rowid, comment) VALUES ('delete', old.id, old.comment);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS core_review_fts_au AFTER UPDATE OF comment ON core_review BEGIN
+        INSERT INTO core_review_fts(core_review_fts, rowid, comment) VALUES ('delete', old.id, old.comment);
+        INSERT INTO core_review_fts(rowid, comment) VALUES (new.id, new.comment);
+    END
+    """,
+    "INSERT INTO core_review_fts(core_review_fts) VALUES ('rebuild')",
+]
+
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS core_review_fts_au",
+    "DROP TRIGGER IF EXISTS core_review_fts_ad",
+    "DROP TRIGGER IF EXISTS core_review_fts_ai",
+    "DROP TABLE IF EXISTS core_review_fts",
+]
+
+POSTGRES_FORWARD = [
+    """
+    CREATE INDEX IF NOT EXISTS core_review_comment_fts
+    ON core_review USING GIN (to_tsvector('english', comment))
+    """,
+]
+
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS core_review_comment_fts",
+]
+
+
+def _run(statements_by_vendor):
+    def run(apps, schema_editor):
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_event_services'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRES_FORWARD}),
+            _run({'sqlite': SQLITE_BACKWARD, 'postgresql': POSTGRES_BACKWARD}),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.4 on 2026-10-19 01:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_chunkedupload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('name', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='event',
+            name='logo',
+            field=models.ImageField(blank=True, max_length=255, null=True, upload_to='uploads/logos'),
+        ),
+        migrations.AlterField(
+            model_name='eventgallery',
+            name='image',
+            field=models.ImageField(blank=True, max_length=255, null=True, upload_to='uploads/event_gallery'),
+        ),
+    ]
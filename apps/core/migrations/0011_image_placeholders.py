@@ -0,0 +1,23 @@
+# Generated by Django 5.1.4 on 2026-10-19 01:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_image_dimensions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='logo_placeholder',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='eventgallery',
+            name='image_placeholder',
+            field=models.TextField(blank=True, editable=False),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.4 on 2026-10-19 02:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_image_placeholders'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='logo_processing_since',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='eventgallery',
+            name='image_processing_since',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
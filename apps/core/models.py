@@ -1,6 +1,13 @@
+import os
+import uuid
+from django.conf import settings
 from django.db import models
 from apps.users.models import User 
 from django.utils.html import strip_tags
+from utils.images import schedule_variants, PROCESSING_STATUS_CHOICES
+
+LOGO_VARIANT_SIZES = {'thumb': 120, 'card': 480}
+GALLERY_VARIANT_SIZES = {'thumb': 320, 'large': 1280}
 
 class Service(models.Model):
     SERVICE_CHOICES = [
@@ -34,7 +41,13 @@ class Event(models.Model):
     brand_name = models.CharField(max_length=100)
     description = models.TextField()
     location = models.CharField(max_length=200)
-    logo = models.ImageField(upload_to='uploads/logos', blank=True, null=True)
+    logo = models.ImageField(upload_to='uploads/logos', max_length=255, blank=True, null=True)
+    logo_variants = models.JSONField(default=dict, blank=True, editable=False)
+    logo_status = models.CharField(max_length=10, choices=PROCESSING_STATUS_CHOICES, blank=True, editable=False)
+    logo_processing_since = models.DateTimeField(null=True, blank=True, editable=False)
+    logo_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    logo_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    logo_placeholder = models.TextField(blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     services = models.ManyToManyField(Service, through='EventService', related_name='events')
@@ -44,6 +57,11 @@ class Event(models.Model):
     def __str__(self):
         return f"{self.brand_name} (by {self.user.first_name})"
 
+    def save(self, *args, **kwargs):
+        """Queue resized logo variants whenever a new logo is stored"""
+        super().save(*args, **kwargs)
+        schedule_variants(self, 'logo', LOGO_VARIANT_SIZES)
+
     def increment_view_count(self):
         """Helper method to increment view count"""
         self.view_count += 1
@@ -70,7 +88,13 @@ class Event(models.Model):
 
 class EventGallery(models.Model):
     event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='gallery_images')
-    image = models.ImageField(upload_to='uploads/event_gallery', null=True, blank=True)
+    image = models.ImageField(upload_to='uploads/event_gallery', max_length=255, null=True, blank=True)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
+    image_status = models.CharField(max_length=10, choices=PROCESSING_STATUS_CHOICES, blank=True, editable=False)
+    image_processing_since = models.DateTimeField(null=True, blank=True, editable=False)
+    image_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_placeholder = models.TextField(blank=True, editable=False)
     uploaded_at = models.DateTimeField(auto_now_add=True)
     is_primary = models.BooleanField(default=False)  
     caption = models.CharField(max_length=255, blank=True)  
@@ -78,6 +102,11 @@ class EventGallery(models.Model):
     def __str__(self):
         return f"Image for {self.event.brand_name}"
 
+    def save(self, *args, **kwargs):
+        """Queue resized image variants whenever a new image is stored"""
+        super().save(*args, **kwargs)
+        schedule_variants(self, 'image', GALLERY_VARIANT_SIZES)
+
     class Meta:
         verbose_name_plural = "Event Galleries"
         ordering = ['-is_primary', '-uploaded_at']
@@ -103,4 +132,41 @@ class Review(models.Model):
         """Ensure rating is between 1 and 5"""
         if self.rating not in range(1, 6):
             raise ValueError("Rating must be between 1 and 5")
-        super().save(*args, **kwargs)
\ No newline at end of file
+        super().save(*args, **kwargs)
+
+
+class ChunkedUpload(models.Model):
+    """An image uploaded in chunks to a temp file, waiting to be attached to an event"""
+    STATUS_UPLOADING = 'uploading'
+    STATUS_COMPLETE = 'complete'
+    STATUS_CHOICES = [
+        (STATUS_UPLOADING, 'Uploading'),
+        (STATUS_COMPLETE, 'Complete'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='chunked_uploads')
+    filename = models.CharField(max_length=255)
+    total_size = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField(default=0)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_UPLOADING)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.total_size} bytes)"
+
+    @property
+    def path(self):
+        """Location of the partially written temp file"""
+        return os.path.join(settings.CHUNKED_UPLOAD_ROOT, str(self.id))
+
+
+class MediaBlob(models.Model):
+    """Reference count for a content-addressed file in media storage"""
+    name = models.CharField(max_length=255, primary_key=True)
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} refs)"
@@ -0,0 +1,77 @@
+import re
+from django.db import connection
+from django.utils.html import escape
+from .models import Review
+
+HIGHLIGHT_START = '<mark>'
+HIGHLIGHT_END = '</mark>'
+
+# The database marks matches with these non-printing characters; the comment
+# is HTML-escaped before they are turned into <mark> tags
+SENTINEL_START = '\x02'
+SENTINEL_END = '\x03'
+
+SQLITE_SEARCH_SQL = """
+    SELECT r.id,
+           highlight(core_review_fts, 0, %s, %s),
+           -bm25(core_review_fts) AS rank
+    FROM core_review_fts
+    JOIN core_review r ON r.id = core_review_fts.rowid
+    WHERE core_review_fts MATCH %s AND r.event_id = %s {approved}
+    ORDER BY rank DESC, r.created_at DESC
+    LIMIT %s
+"""
+
+POSTGRES_SEARCH_SQL = """
+    SELECT r.id,
+           ts_headline('english', r.comment, q, %s),
+           ts_rank(to_tsvector('english', r.comment), q) AS rank
+    FROM core_review r, plainto_tsquery('english', %s) q
+    WHERE to_tsvector('english', r.comment) @@ q AND r.event_id = %s {approved}
+    ORDER BY rank DESC, r.created_at DESC
+    LIMIT %s
+"""
+
+
+def _sqlite_match_expression(query):
+    """Quote every word so user input can't be parsed as FTS5 syntax"""
+    terms = re.findall(r'\w+', query)
+    return ' '.join(f'"{term}"' for term in terms)
+
+
+def _highlight_html(text):
+    """Escape text and turn the sentinel-marked matches into <mark> tags"""
+    return escape(text).replace(SENTINEL_START, HIGHLIGHT_START).replace(SENTINEL_END, HIGHLIGHT_END)
+
+
+def search_event_reviews(event, query, limit=20, approved_only=True):
+    """
+    Ranked full-text search over an event's review comments.
+
+    Returns a list of (review, highlighted_comment, rank) tuples, best match first.
+    SQLite uses the core_review_fts FTS5 table and PostgreSQL the GIN
+    tsvector index, both kept in sync by the database itself.
+    """
+    approved = 'AND r.is_approved' if approved_only else ''
+
+    if connection.vendor == 'sqlite':
+        match = _sqlite_match_expression(query)
+        if not match:
+            return []
+        sql = SQLITE_SEARCH_SQL.format(approved=approved)
+        params = [SENTINEL_START, SENTINEL_END, match, event.pk, limit]
+    elif connection.vendor == 'postgresql':
+        sql = POSTGRES_SEARCH_SQL.format(approved=approved)
+        params = [f'StartSel={SENTINEL_START}, StopSel={SENTINEL_END}', query, event.pk, limit]
+    else:
+        reviews = event.reviews.filter(comment__icontains=query).select_related('user', 'event')
+        if approved_only:
+            reviews = reviews.filter(is_approved=True)
+        return [(review, escape(review.comment), None) for review in reviews[:limit]]
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    reviews = Review.objects.select_related('user', 'event').in_bulk([row[0] for row in rows])
+    return [(reviews[pk], _highlight_html(highlight), rank) for pk, highlight, rank in rows if pk in reviews]
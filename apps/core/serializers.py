@@ -1,14 +1,118 @@
-from django.core.exceptions import ObjectDoesNotExist
+from concurrent.futures import FIRST_EXCEPTION, wait
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import models, transaction
 from rest_framework import serializers
-from .models import Event, EventGallery, Service, Review, EventService
+from rest_framework.fields import get_error_detail
+from .models import Event, EventGallery, Service, Review, EventService, GALLERY_VARIANT_SIZES
+from utils.images import (
+    enqueue_variants, variant_urls, image_srcset, image_dimensions, get_validation_executor, STATUS_PENDING
+)
 import json
 import logging
 
 logger = logging.getLogger(__name__)
 
 def create_gallery_images(event, images):
+    gallery = []
     for image in images:
-        EventGallery.objects.create(event=event, image=image)
+        width, height = image_dimensions(image)
+        gallery.append(EventGallery(
+            event=event, image=image, image_status=STATUS_PENDING, image_width=width, image_height=height
+        ))
+    gallery = EventGallery.objects.bulk_create(gallery)
+    # bulk_create skips EventGallery.save(), so queue the variants here
+    for gallery_image in gallery:
+        enqueue_variants(EventGallery, gallery_image.pk, 'image', GALLERY_VARIANT_SIZES)
+
+
+def get_services_by_name(services_data):
+    """Resolve all requested services with a single IN query"""
+    names = {service_data['service']['name'] for service_data in services_data}
+    services = {service.name: service for service in Service.objects.filter(name__in=names)} if names else {}
+    missing = names - services.keys()
+    if missing:
+        raise serializers.ValidationError(f"Service '{sorted(missing)[0]}' does not exist.")
+    return services
+
+
+def create_event_services(event, services_data):
+    services = get_services_by_name(services_data)
+    EventService.objects.bulk_create([
+        EventService(
+            event=event,
+            service=services[service_data['service']['name']],
+            service_short_description=service_data.get('service_short_description', '')
+        )
+        for service_data in services_data
+    ])
+
+
+class PooledImageField(serializers.ImageField):
+    """ImageField that reuses the result of ConcurrentImageValidationMixin when there is one"""
+
+    def to_internal_value(self, data):
+        validated = getattr(self.root, '_validated_images', {})
+        if id(data) in validated:
+            return validated[id(data)]
+        return self.validate_image(data)
+
+    def validate_image(self, data):
+        return super().to_internal_value(data)
+
+
+class ConcurrentImageValidationMixin:
+    """
+    Verifies all uploaded images of a serializer at once on the shared
+    validation pool rather than one after another, and gives up as soon as
+    one of them is invalid. Model image fields become PooledImageField;
+    declare lists of images with child=PooledImageField().
+    """
+    serializer_field_mapping = {
+        **serializers.ModelSerializer.serializer_field_mapping,
+        models.ImageField: PooledImageField,
+    }
+
+    def _image_uploads(self, data):
+        """(field name, list index or None, field, file) for every image to verify"""
+        uploads = []
+        for field in self._writable_fields:
+            value = data.get(field.field_name) if hasattr(data, 'get') else None
+            if isinstance(field, PooledImageField) and value:
+                uploads.append((field.field_name, None, field, value))
+            elif isinstance(field, serializers.ListField) and isinstance(field.child, PooledImageField):
+                values = data.getlist(field.field_name) if hasattr(data, 'getlist') else value
+                if isinstance(values, (list, tuple)):
+                    uploads += [(field.field_name, index, field.child, f) for index, f in enumerate(values) if f]
+        return uploads
+
+    def to_internal_value(self, data):
+        uploads = self._image_uploads(data)
+        self._validated_images = {}
+        if len(uploads) > 1:
+            futures = {
+                get_validation_executor().submit(field.validate_image, f): (field_name, index, f)
+                for field_name, index, field, f in uploads
+            }
+            done, not_done = wait(futures, return_when=FIRST_EXCEPTION)
+            for future in done:
+                field_name, index, f = futures[future]
+                if future.exception() is None:
+                    self._validated_images[id(f)] = future.result()
+                    continue
+                for pending in not_done:
+                    pending.cancel()
+                error = future.exception()
+                if isinstance(error, serializers.ValidationError):
+                    detail = error.detail
+                elif isinstance(error, DjangoValidationError):
+                    detail = get_error_detail(error)
+                else:
+                    raise error
+                raise serializers.ValidationError({field_name: detail if index is None else {index: detail}})
+        try:
+            return super().to_internal_value(data)
+        finally:
+            self._validated_images = {}
 
 
 class ServiceSerializer(serializers.ModelSerializer):
@@ -26,11 +130,15 @@ class ServiceSerializer(serializers.ModelSerializer):
 
 class EventGallerySerializer(serializers.ModelSerializer):
     image_url = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = EventGallery
-        fields = ['id', 'image', 'image_url', 'uploaded_at', 'is_primary', 'caption']
-        read_only_fields = ['id', 'uploaded_at', 'image_url']
+        fields = ['id', 'image', 'image_url', 'image_variants', 'image_srcset', 'image_width', 'image_height',
+                  'image_placeholder', 'image_status', 'uploaded_at', 'is_primary', 'caption']
+        read_only_fields = ['id', 'uploaded_at', 'image_url', 'image_variants', 'image_srcset', 'image_width',
+                            'image_height', 'image_placeholder', 'image_status']
 
     def get_image_url(self, obj):
         request = self.context.get('request')
@@ -38,6 +146,12 @@ class EventGallerySerializer(serializers.ModelSerializer):
             return request.build_absolute_uri(obj.image.url)
         return None
 
+    def get_image_variants(self, obj):
+        return variant_urls(self.context.get('request'), obj.image_variants)
+
+    def get_image_srcset(self, obj):
+        return image_srcset(self.context.get('request'), obj.image, obj.image_variants, obj.image_width)
+
     def validate(self, data):
         event = self.context.get('event')
         if event and event.gallery_images.count() >= 5:
@@ -113,11 +227,11 @@ class EventServiceSerializer(serializers.ModelSerializer):
         return value
 
 
-class EventSerializer(serializers.ModelSerializer):
+class EventSerializer(ConcurrentImageValidationMixin, serializers.ModelSerializer):
     services = EventServiceSerializer(source='eventservice_set', many=True, required=False)
     gallery_images = EventGallerySerializer(many=True, required=False, read_only=True)
     gallery_uploads = serializers.ListField(
-        child=serializers.ImageField(),
+        child=PooledImageField(),
         write_only=True,
         required=False,
         max_length=5
@@ -128,6 +242,8 @@ class EventSerializer(serializers.ModelSerializer):
     user_profile_image = serializers.SerializerMethodField()
     user_mobile_no = serializers.CharField(source='user.mobile_no', read_only=True)
     logo_url = serializers.SerializerMethodField()
+    logo_variants = serializers.SerializerMethodField()
+    logo_srcset = serializers.SerializerMethodField()
     view_count = serializers.IntegerField(read_only=True)
 
     all_reviews = ReviewSerializer(many=True, read_only=True)
@@ -139,8 +255,8 @@ class EventSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'user', 'user_email', 'user_first_name', 'user_mobile_no', 'user_last_name',
             'user_profile_image', 
-            'brand_name', 'event_title', 'description', 'location', 'logo', 'logo_url',
-            'services', 'gallery_images', 'gallery_uploads',
+            'brand_name', 'event_title', 'description', 'location', 'logo', 'logo_url', 'logo_variants',
+            'logo_srcset', 'logo_width', 'logo_height', 'logo_placeholder', 'logo_status', 'services', 'gallery_images', 'gallery_uploads',
             'created_at', 'updated_at', 'view_count', 'is_active',
             'all_reviews', 'all_rating_count', 'all_comment_count'
         ]
@@ -161,6 +277,12 @@ class EventSerializer(serializers.ModelSerializer):
             return request.build_absolute_uri(obj.logo.url)
         return None
 
+    def get_logo_variants(self, obj):
+        return variant_urls(self.context.get('request'), obj.logo_variants)
+
+    def get_logo_srcset(self, obj):
+        return image_srcset(self.context.get('request'), obj.logo, obj.logo_variants, obj.logo_width)
+
     def validate_gallery_uploads(self, value):
         if len(value) > 5:
             raise serializers.ValidationError("You can upload a maximum of 5 images.")
@@ -171,6 +293,7 @@ class EventSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Description is too long (max 10000 characters)")
         return value
 
+    @transaction.atomic
     def create(self, validated_data):
         services_data = validated_data.pop('eventservice_set', [])
         gallery_images = validated_data.pop('gallery_uploads', [])
@@ -178,20 +301,11 @@ class EventSerializer(serializers.ModelSerializer):
         event = Event.objects.create(**validated_data)
         
         # Create EventService records with descriptions
-        for service_data in services_data:
-            try:
-                service = Service.objects.get(name=service_data['service']['name'])
-                EventService.objects.create(
-                    event=event,
-                    service=service,
-                    service_short_description=service_data.get('service_short_description', '')
-                )
-            except ObjectDoesNotExist:
-                raise serializers.ValidationError(f"Service '{service_data['service']['name']}' does not exist.")
-
+        create_event_services(event, services_data)
         create_gallery_images(event, gallery_images)
         return event
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         services_data = validated_data.pop('eventservice_set', None)
         gallery_images = validated_data.pop('gallery_uploads', [])
@@ -212,36 +326,33 @@ class EventSerializer(serializers.ModelSerializer):
         if services_data is not None:
             try:
                 # Get existing EventService records
-                existing_services = {es.service.name: es for es in instance.eventservice_set.all()}
-                
-                # Process each service in update data
-                for service_data in services_data:
-                    try:
-                        service_name = service_data['service']['name']
-                        service = Service.objects.get(name=service_name)
-                        
-                        # Update or create EventService record
-                        event_service, created = EventService.objects.get_or_create(
-                            event=instance,
-                            service=service,
-                            defaults={
-                                'service_short_description': service_data.get('service_short_description', '')
-                            }
-                        )
-                        if not created:
-                            event_service.service_short_description = service_data.get('service_short_description', '')
-                            event_service.save()
-                        
-                        # Remove from existing services dict
-                        if service.name in existing_services:
-                            del existing_services[service.name]
-                    
-                    except Service.DoesNotExist:
-                        raise serializers.ValidationError(f"Service '{service_name}' does not exist.")
-
-                # Delete services that weren't in the update data
-                for remaining_service in existing_services.values():
-                    remaining_service.delete()
+                existing_services = {
+                    es.service.name: es for es in instance.eventservice_set.select_related('service')
+                }
+                requested = {
+                    service_data['service']['name']: service_data.get('service_short_description', '')
+                    for service_data in services_data
+                }
+                services = get_services_by_name(services_data)
+
+                to_create = [
+                    EventService(event=instance, service=services[name], service_short_description=description)
+                    for name, description in requested.items() if name not in existing_services
+                ]
+                to_update = []
+                for name, event_service in existing_services.items():
+                    if name in requested and event_service.service_short_description != requested[name]:
+                        event_service.service_short_description = requested[name]
+                        to_update.append(event_service)
+                to_delete = [es.id for name, es in existing_services.items() if name not in requested]
+
+                # Apply the diff: one delete, one update and one insert at most
+                if to_delete:
+                    EventService.objects.filter(id__in=to_delete).delete()
+                if to_update:
+                    EventService.objects.bulk_update(to_update, ['service_short_description'])
+                if to_create:
+                    EventService.objects.bulk_create(to_create)
             except Exception as e:
                 raise serializers.ValidationError(f"Error updating services: {str(e)}")
 
@@ -266,10 +377,10 @@ class EventSerializer(serializers.ModelSerializer):
         return instance
 
 
-class EventCreateSerializer(serializers.ModelSerializer):
+class EventCreateSerializer(ConcurrentImageValidationMixin, serializers.ModelSerializer):
     services = EventServiceSerializer(many=True, required=False, source='eventservice_set')
     gallery_images = serializers.ListField(
-        child=serializers.ImageField(),
+        child=PooledImageField(),
         write_only=True,
         required=False,
         max_length=5
@@ -294,22 +405,13 @@ class EventCreateSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("You can upload a maximum of 5 images.")
         return value
 
+    @transaction.atomic
     def create(self, validated_data):
         services_data = validated_data.pop('eventservice_set', [])
         gallery_images = validated_data.pop('gallery_images', [])
 
         event = Event.objects.create(**validated_data)
 
-        for service_data in services_data:
-            try:
-                service = Service.objects.get(name=service_data['service']['name'])
-                EventService.objects.create(
-                    event=event,
-                    service=service,
-                    service_short_description=service_data.get('service_short_description', '')
-                )
-            except ObjectDoesNotExist:
-                raise serializers.ValidationError(f"Service '{service_data['service']['name']}' does not exist.")
-
+        create_event_services(event, services_data)
         create_gallery_images(event, gallery_images)
         return event
\ No newline at end of file
@@ -0,0 +1,37 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from utils.images import stored_file_names
+from utils.storage import delete_files_on_commit
+from .caching import invalidate_seller_events
+from .models import Event, EventGallery, EventService, Review
+
+
+@receiver(post_delete, sender=Event)
+def delete_event_logo(sender, instance, **kwargs):
+    delete_files_on_commit(stored_file_names(instance, 'logo'))
+
+
+@receiver(post_delete, sender=EventGallery)
+def delete_gallery_image(sender, instance, **kwargs):
+    delete_files_on_commit(stored_file_names(instance, 'image'))
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+def forget_seller_events(sender, instance, **kwargs):
+    invalidate_seller_events(instance.user_id)
+
+
+@receiver(post_save, sender=EventGallery)
+@receiver(post_delete, sender=EventGallery)
+@receiver(post_save, sender=EventService)
+@receiver(post_delete, sender=EventService)
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def forget_event_seller_events(sender, instance, origin=None, **kwargs):
+    if isinstance(origin, Event):
+        # Cascading from an event delete, which invalidates once for all its rows
+        return
+    user_id = Event.objects.filter(pk=instance.event_id).values_list('user_id', flat=True).first()
+    if user_id is not None:
+        invalidate_seller_events(user_id)
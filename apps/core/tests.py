@@ -1,3 +1,41 @@
-from django.test import TestCase
+from django.test import SimpleTestCase
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+from rest_framework.views import APIView
+from utils.throttling import SharedScopedRateThrottle
 
-# Create your tests here.
+
+class TwoPerMinuteThrottle(SharedScopedRateThrottle):
+    THROTTLE_RATES = {'scoped-test': '2/min'}
+
+
+class ScopedView(APIView):
+    authentication_classes = []
+    permission_classes = []
+    throttle_classes = [TwoPerMinuteThrottle]
+    throttle_scope = 'scoped-test'
+
+    def get(self, request):
+        return Response({})
+
+
+class UnscopedView(ScopedView):
+    throttle_scope = None
+
+
+class SharedScopedRateThrottleTests(SimpleTestCase):
+    def request(self, view, ip):
+        return view.as_view()(APIRequestFactory().get('/', REMOTE_ADDR=ip))
+
+    def test_limits_requests_at_the_scope_rate(self):
+        statuses = [self.request(ScopedView, '203.0.113.1').status_code for _ in range(3)]
+        self.assertEqual(statuses, [200, 200, 429])
+
+    def test_counts_each_client_separately(self):
+        self.request(ScopedView, '203.0.113.2')
+        self.request(ScopedView, '203.0.113.2')
+        self.assertEqual(self.request(ScopedView, '203.0.113.3').status_code, 200)
+
+    def test_views_without_a_scope_are_not_throttled(self):
+        statuses = [self.request(UnscopedView, '203.0.113.4').status_code for _ in range(3)]
+        self.assertEqual(statuses, [200, 200, 200])
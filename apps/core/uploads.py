@@ -0,0 +1,175 @@
+import mimetypes
+import os
+import shutil
+import uuid
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.utils import timezone
+from PIL import Image
+from .models import ChunkedUpload
+
+READ_BLOCK_SIZE = 64 * 1024
+
+# Leading bytes of the image formats we accept
+IMAGE_SIGNATURES = (
+    b'\xff\xd8\xff',        # JPEG
+    b'\x89PNG\r\n\x1a\n',   # PNG
+    b'GIF87a',
+    b'GIF89a',
+)
+
+
+class ChunkedUploadError(Exception):
+    pass
+
+
+class ChunkedUploadFile(UploadedFile):
+    """
+    A finished chunked upload. Exposes temporary_file_path() so Pillow
+    validates it from disk and FileSystemStorage moves it into MEDIA_ROOT
+    instead of copying it.
+    """
+
+    def __init__(self, upload):
+        content_type = mimetypes.guess_type(upload.filename)[0] or 'application/octet-stream'
+        super().__init__(open(upload.path, 'rb'), upload.filename, content_type, upload.total_size)
+        self.upload = upload
+
+    def temporary_file_path(self):
+        return self.upload.path
+
+
+def _looks_like_image(header):
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return True
+    return any(header.startswith(signature) for signature in IMAGE_SIGNATURES)
+
+
+def write_chunk(upload, stream, offset, length):
+    """
+    Append one chunk read from stream to the upload's temp file. Data is
+    copied in READ_BLOCK_SIZE blocks, so memory use doesn't depend on the
+    chunk or file size. Returns the new offset.
+
+    Nothing is locked while the client sends the chunk: it is staged in a
+    file of its own, then a conditional UPDATE moves the offset forward and
+    only the request that moved it copies its chunk into place. Of
+    concurrent PUTs at the same offset one wins and the rest are rejected.
+    """
+    _check_chunk(upload, offset, length)
+    os.makedirs(settings.CHUNKED_UPLOAD_ROOT, exist_ok=True)
+    part_path = f"{upload.path}.{uuid.uuid4().hex}.part"
+    try:
+        _receive_chunk(stream, part_path, offset, length)
+        claimed = ChunkedUpload.objects.filter(
+            pk=upload.pk, status=ChunkedUpload.STATUS_UPLOADING, offset=offset
+        ).update(offset=offset + length, updated_at=timezone.now())
+        if not claimed:
+            # Another request got there first; report where the upload is now
+            upload.refresh_from_db(fields=['offset', 'status'])
+            _check_chunk(upload, offset, length)
+            raise ChunkedUploadError(f"Expected offset {upload.offset}.")
+        _copy_chunk(part_path, upload.path, offset)
+    finally:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+
+    upload.offset = offset + length
+    if upload.offset == upload.total_size:
+        if not _is_valid_image(upload.path):
+            discard_upload(upload)
+            raise ChunkedUploadError("Upload a valid image. The file you uploaded was either not an image or a corrupted image.")
+        upload.status = ChunkedUpload.STATUS_COMPLETE
+        ChunkedUpload.objects.filter(pk=upload.pk).update(status=upload.status, updated_at=timezone.now())
+    return upload.offset
+
+
+def _check_chunk(upload, offset, length):
+    if upload.status != ChunkedUpload.STATUS_UPLOADING:
+        raise ChunkedUploadError("This upload is already complete.")
+    if offset != upload.offset:
+        raise ChunkedUploadError(f"Expected offset {upload.offset}.")
+    if length <= 0 or length > settings.CHUNKED_UPLOAD_MAX_CHUNK_SIZE:
+        raise ChunkedUploadError(f"Chunk size must be between 1 and {settings.CHUNKED_UPLOAD_MAX_CHUNK_SIZE} bytes.")
+    if offset + length > upload.total_size:
+        raise ChunkedUploadError("Chunk goes past the declared file size.")
+
+
+def _receive_chunk(stream, path, offset, length):
+    """Read exactly length bytes of the request body into path"""
+    written = 0
+    with open(path, 'wb') as destination:
+        while written < length:
+            block = stream.read(min(READ_BLOCK_SIZE, length - written))
+            if not block:
+                break
+            if offset + written == 0 and not _looks_like_image(block[:12]):
+                raise ChunkedUploadError("Upload a valid image. The file is not a JPEG, PNG, GIF or WebP image.")
+            destination.write(block)
+            written += len(block)
+    if written != length:
+        raise ChunkedUploadError("Chunk body is shorter than its declared length.")
+
+
+def _copy_chunk(part_path, path, offset):
+    # Opened without truncating: a later chunk may already have been copied past this one
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o666)
+    with open(part_path, 'rb') as source, os.fdopen(fd, 'r+b') as destination:
+        destination.seek(offset)
+        shutil.copyfileobj(source, destination, READ_BLOCK_SIZE)
+
+
+def _is_valid_image(path):
+    try:
+        with Image.open(path) as image:
+            image.verify()
+    except Exception:
+        return False
+    return True
+
+
+def discard_upload(upload):
+    if os.path.exists(upload.path):
+        os.remove(upload.path)
+    upload.delete()
+
+
+def resolve_uploads(user, upload_ids):
+    """Completed uploads of this user as file objects, in the order requested"""
+    try:
+        upload_ids = [uuid.UUID(str(upload_id)) for upload_id in upload_ids]
+    except ValueError:
+        raise ChunkedUploadError("Upload IDs must be valid UUIDs.")
+
+    uploads = ChunkedUpload.objects.filter(
+        user=user, status=ChunkedUpload.STATUS_COMPLETE
+    ).in_bulk(upload_ids)
+    files = []
+    for upload_id in upload_ids:
+        upload = uploads.get(upload_id)
+        if upload is None or not os.path.exists(upload.path):
+            close_uploads(files)
+            raise ChunkedUploadError(f"Upload {upload_id} does not exist or is not complete.")
+        files.append(ChunkedUploadFile(upload))
+    return files
+
+
+def close_uploads(files):
+    """Close the files resolve_uploads() opened, for requests that end without saving them"""
+    for f in files:
+        if isinstance(f, ChunkedUploadFile):
+            f.close()
+
+
+def release_uploads(files):
+    """Forget uploads that were saved into media storage"""
+    upload_ids = []
+    for f in files:
+        if isinstance(f, ChunkedUploadFile):
+            f.close()
+            # Storage moves the temp file unless it already had an identical blob
+            if os.path.exists(f.upload.path):
+                os.remove(f.upload.path)
+            upload_ids.append(f.upload.pk)
+    if upload_ids:
+        ChunkedUpload.objects.filter(pk__in=upload_ids).delete()
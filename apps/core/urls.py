@@ -5,18 +5,25 @@ from .views import (
     EventDeleteView,
     EventListView,
     EventDetailView,
+    MyEventsView,
     ReviewListView,
+    ReviewBatchListView,
+    ReviewSearchView,
     ReviewCreateView,
     ReviewEditView,
     ReviewDeleteView,
     DashboardView,
-    EventSuggestionsView
+    CacheStatsView,
+    EventSuggestionsView,
+    ChunkedUploadView,
+    ChunkedUploadDetailView
 )
 
 urlpatterns = [
     # Public endpoints (no authentication required)
     path('events/', EventListView.as_view(), name='event-list'), 
     path('events/<int:pk>/', EventDetailView.as_view(), name='event-detail'),  
+    path('events/mine/', MyEventsView.as_view(), name='my-events'),
     
     # Protected endpoints (require authentication and seller role)
     path('events/suggestions/', EventSuggestionsView.as_view(), name='event-suggestions'),
@@ -24,9 +31,14 @@ urlpatterns = [
     path('events/edit/<int:pk>/', EventEditView.as_view(), name='event-edit'),
     path('events/delete/<int:pk>/', EventDeleteView.as_view(), name='event-delete'),
     path('dashboard/', DashboardView.as_view(), name='dashboard'),
+    path('cache-stats/', CacheStatsView.as_view(), name='cache-stats'),
+    path('uploads/', ChunkedUploadView.as_view(), name='chunked-upload-create'),
+    path('uploads/<uuid:upload_id>/', ChunkedUploadDetailView.as_view(), name='chunked-upload-detail'),
     
     # Review endpoints
+    path('events/reviews/batch/', ReviewBatchListView.as_view(), name='event-reviews-batch'),
     path('events/<int:event_pk>/reviews/', ReviewListView.as_view(), name='event-reviews-list'),
+    path('events/<int:event_pk>/reviews/search/', ReviewSearchView.as_view(), name='event-reviews-search'),
     path('events/<int:event_pk>/reviews/create/', ReviewCreateView.as_view(), name='event-reviews-create'),
     path('events/<int:pk>/reviews/<int:review_pk>/edit/', ReviewEditView.as_view(), name='review-edit'),
     path('events/<int:pk>/reviews/<int:review_pk>/delete/', ReviewDeleteView.as_view(), name='review-delete'),
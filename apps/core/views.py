@@ -1,28 +1,81 @@
 import json
 import logging
+from django.conf import settings
 from django.http import Http404
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from django.core.cache import caches
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
 from .serializers import EventSerializer, EventCreateSerializer, ReviewSerializer
+from .search import search_event_reviews
+from .caching import seller_events_version, get_seller_events, cache_seller_events
+from .uploads import ChunkedUploadError, write_chunk, resolve_uploads, release_uploads, close_uploads
 from rest_framework import status
 from apps.users.serializers import UserSerializer
 from .models import Event
 from .models import Review
-from django.db import models
+from .models import ChunkedUpload
 from django.utils import timezone
-from rest_framework.throttling import UserRateThrottle
+from utils.throttling import SharedUserRateThrottle
 from rest_framework.pagination import PageNumberPagination
 from django.db.models import Q
 from rest_framework.parsers import MultiPartParser, FormParser
 from datetime import timedelta
-from django.db.models import Sum, Avg, Count
+from django.db.models import Sum, Avg, Count, F, Window
+from django.db.models.functions import RowNumber
 
 
 logger = logging.getLogger(__name__)
 
 
+def get_chunked_upload_files(request):
+    """
+    Files uploaded earlier through the chunked upload endpoints, referenced
+    by `logo_upload_id` and `gallery_upload_ids` (JSON list of IDs).
+    """
+    logo_upload_id = request.data.get('logo_upload_id')
+    gallery_upload_ids = request.data.get('gallery_upload_ids')
+    if gallery_upload_ids:
+        try:
+            gallery_upload_ids = json.loads(gallery_upload_ids) if isinstance(gallery_upload_ids, str) else gallery_upload_ids
+            if not isinstance(gallery_upload_ids, list):
+                raise ValueError
+        except ValueError:
+            raise ChunkedUploadError("gallery_upload_ids must be a JSON list of upload IDs.")
+
+    logo = resolve_uploads(request.user, [logo_upload_id])[0] if logo_upload_id else None
+    try:
+        gallery = resolve_uploads(request.user, gallery_upload_ids) if gallery_upload_ids else []
+    except ChunkedUploadError:
+        close_uploads([logo])
+        raise
+    return logo, gallery
+
+
+def wants_full_response(request):
+    """Writes answer with a summary unless the client asks for `?return=full`"""
+    return request.query_params.get('return') == 'full'
+
+
+def event_write_summary(request, event, logo_changed, previous_gallery_ids=()):
+    """
+    Minimal response to an event create or edit: the id, the new updated_at
+    and the URLs of the images this write stored.
+    """
+    urls = {}
+    if logo_changed and event.logo:
+        urls['logo'] = request.build_absolute_uri(event.logo.url)
+    new_gallery_images = event.gallery_images.exclude(pk__in=previous_gallery_ids).only('id', 'image')
+    gallery_urls = [
+        {'id': gallery_image.id, 'image_url': request.build_absolute_uri(gallery_image.image.url)}
+        for gallery_image in new_gallery_images if gallery_image.image
+    ]
+    if gallery_urls:
+        urls['gallery_images'] = gallery_urls
+    return {'id': event.id, 'updated_at': event.updated_at, 'urls': urls}
+
+
 # create view
 class EventCreateView(APIView):
     parser_classes = [MultiPartParser, FormParser]
@@ -69,31 +122,45 @@ class EventCreateView(APIView):
             for service in services_data:
                 service['service_short_description'] = service.get('service_short_description', '')
 
+        try:
+            uploaded_logo, uploaded_gallery = get_chunked_upload_files(request)
+        except ChunkedUploadError as e:
+            return Response({"uploads": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
         data = {
             'event_title': request.data.get('event_title'),
             'brand_name': request.data.get('brand_name'),
             'description': request.data.get('description'),
             'location': request.data.get('location'),
-            'logo': request.FILES.get('logo'),
+            'logo': request.FILES.get('logo') or uploaded_logo,
             'services': services_data,
-            'gallery_images': request.FILES.getlist('gallery_images', [])
+            'gallery_images': request.FILES.getlist('gallery_images', []) + uploaded_gallery
         }
         serializer = EventCreateSerializer(data=data, context={'request': request})
 
         if not serializer.is_valid():
             logger.error(f"Event creation validation errors: {serializer.errors}")
+            close_uploads([uploaded_logo, *uploaded_gallery])
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
         try:
             event = serializer.save(user=request.user)
+            release_uploads([uploaded_logo, *uploaded_gallery])
             logger.info(f"Event created successfully by {request.user.email}")
         except Exception as e:
+            close_uploads([uploaded_logo, *uploaded_gallery])
             logger.error(f"Error creating event: {str(e)}", exc_info=True)
             return Response(
                 {"detail": "An error occurred while creating the event."}, 
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+        if not wants_full_response(request):
+            return Response({
+                "message": "Event created successfully.",
+                "event": event_write_summary(request, event, logo_changed=True),
+            }, status=status.HTTP_201_CREATED)
+
         # Get complete user data with profile image URL
         user_data = UserSerializer(request.user, context={'request': request}).data
         
@@ -176,14 +243,22 @@ class EventEditView(APIView):
             'location': request.data.get('location', event.location),
             'services': services_data,
         }
+        try:
+            uploaded_logo, uploaded_gallery = get_chunked_upload_files(request)
+        except ChunkedUploadError as e:
+            return Response({"uploads": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
         if 'logo' in request.FILES:
             data['logo'] = request.FILES['logo']
+        elif uploaded_logo:
+            data['logo'] = uploaded_logo
         else:
             # If no logo provided, keep existing
             data['logo'] = event.logo
 
-        gallery_images = request.FILES.getlist('gallery_images')
+        gallery_images = request.FILES.getlist('gallery_images') + uploaded_gallery
         if gallery_images and len(gallery_images) > 5:
+            close_uploads([uploaded_logo, *uploaded_gallery])
             return Response({"gallery_images": "You can upload a maximum of 5 images."}, status=status.HTTP_400_BAD_REQUEST)
 
         existing_gallery_ids = request.data.get('existing_gallery_ids')
@@ -193,8 +268,12 @@ class EventEditView(APIView):
                 if not isinstance(existing_ids_list, list):
                     raise ValueError
         except Exception:
+            close_uploads([uploaded_logo, *uploaded_gallery])
             return Response({"existing_gallery_ids": "Must be a JSON list of IDs."}, status=status.HTTP_400_BAD_REQUEST)
 
+        if gallery_images:
+            data['gallery_uploads'] = gallery_images
+
         context = {
             'request': request,
             'gallery_uploads': gallery_images,
@@ -204,16 +283,23 @@ class EventEditView(APIView):
         serializer = EventSerializer(event, data=data, partial=True, context=context)
         
         if not serializer.is_valid():
+            close_uploads([uploaded_logo, *uploaded_gallery])
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         validated_data = serializer.validated_data
-        validated_data['gallery_uploads'] = gallery_images  
         validated_data['existing_gallery_ids'] = existing_gallery_ids  
 
+        previous_gallery_ids = list(event.gallery_images.values_list('id', flat=True))
         try:
             updated_event = serializer.update(event, validated_data)
+            release_uploads([uploaded_logo, *uploaded_gallery])
+            if not wants_full_response(request):
+                logo_changed = 'logo' in request.FILES or uploaded_logo is not None
+                summary = event_write_summary(request, updated_event, logo_changed, previous_gallery_ids)
+                return Response(summary, status=status.HTTP_200_OK)
             response_serializer = EventSerializer(updated_event, context={'request': request})
             return Response(response_serializer.data, status=status.HTTP_200_OK)
         except Exception as e:
+            close_uploads([uploaded_logo, *uploaded_gallery])
             logger.error(f"Error updating event: {str(e)}", exc_info=True) 
             return Response(
                 {"detail": "An error occurred while updating the event.", "error": str(e)}, 
@@ -257,6 +343,81 @@ class EventDeleteView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
         
+# chunked upload views
+class ChunkedUploadView(APIView):
+    """Start a resumable upload; chunks are then sent to ChunkedUploadDetailView"""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        filename = str(request.data.get('filename', '')).strip()
+        try:
+            total_size = int(request.data.get('total_size'))
+        except (TypeError, ValueError):
+            return Response({"total_size": "Must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not filename:
+            return Response({"filename": "This field is required."}, status=status.HTTP_400_BAD_REQUEST)
+        if total_size <= 0 or total_size > settings.CHUNKED_UPLOAD_MAX_SIZE:
+            return Response(
+                {"total_size": f"File size must be between 1 and {settings.CHUNKED_UPLOAD_MAX_SIZE} bytes."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        upload = ChunkedUpload.objects.create(user=request.user, filename=filename[:255], total_size=total_size)
+        return Response(
+            {"id": upload.id, "offset": upload.offset, "total_size": upload.total_size, "status": upload.status},
+            status=status.HTTP_201_CREATED
+        )
+
+
+class ChunkedUploadDetailView(APIView):
+    """
+    GET returns the current offset so an interrupted upload can resume.
+    PUT appends the raw request body at the `Upload-Offset` header (or `?offset=`).
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get_upload(self, upload_id, user):
+        try:
+            return ChunkedUpload.objects.get(pk=upload_id, user=user)
+        except ChunkedUpload.DoesNotExist:
+            raise Http404
+
+    def get(self, request, upload_id, *args, **kwargs):
+        upload = self.get_upload(upload_id, request.user)
+        return Response(
+            {"id": upload.id, "offset": upload.offset, "total_size": upload.total_size, "status": upload.status},
+            status=status.HTTP_200_OK
+        )
+
+    def put(self, request, upload_id, *args, **kwargs):
+        upload = self.get_upload(upload_id, request.user)
+        try:
+            offset = int(request.headers.get('Upload-Offset', request.query_params.get('offset', '')))
+            length = int(request.headers.get('Content-Length', ''))
+        except ValueError:
+            return Response(
+                {"detail": "Upload-Offset and Content-Length headers are required."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            # Read the raw body stream; request.data would buffer the whole chunk
+            write_chunk(upload, request.stream, offset, length)
+        except ChunkedUploadError as e:
+            return Response({"detail": str(e), "offset": upload.offset}, status=status.HTTP_409_CONFLICT)
+        except Exception as e:
+            logger.error(f"Error writing chunk for upload {upload_id}: {str(e)}", exc_info=True)
+            return Response(
+                {"detail": "An error occurred while storing the chunk."},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+        return Response(
+            {"id": upload.id, "offset": upload.offset, "total_size": upload.total_size, "status": upload.status},
+            status=status.HTTP_200_OK
+        )
+
 # All events
 class EventListView(APIView):
     def get(self, request, *args, **kwargs):
@@ -320,6 +481,41 @@ class EventSuggestionsView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+# signed-in seller's events
+class MyEventsView(APIView):
+    """
+    The seller's own events, served from the cache until one of them changes.
+    The cache version doubles as the ETag, so an unchanged list costs a 304.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        try:
+            version = seller_events_version(request.user.id)
+            etag = f'"{version}"'
+            headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+            if etag in [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]:
+                return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+            base_url = request.build_absolute_uri('/')
+            data = get_seller_events(request.user.id, version, base_url)
+            if data is None:
+                events = (
+                    Event.objects.filter(user=request.user).select_related('user')
+                    .prefetch_related('eventservice_set__service', 'gallery_images', 'reviews__user')
+                    .order_by('-created_at')
+                )
+                data = EventSerializer(events, many=True, context={'request': request}).data
+                cache_seller_events(request.user.id, version, base_url, data)
+            return Response(data, status=status.HTTP_200_OK, headers=headers)
+
+        except Exception as e:
+            logger.error(f"Error retrieving events of user {request.user.id}: {str(e)}", exc_info=True)
+            return Response(
+                {"detail": "An error occurred while retrieving your events."},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
 # details event
 class EventDetailView(APIView):
     permission_classes = [AllowAny]
@@ -332,9 +528,9 @@ class EventDetailView(APIView):
     def get(self, request, pk, *args, **kwargs):
         try:
             event = self.get_object(pk)           
-            event.view_count = models.F('view_count') + 1
-            event.save()
-            event.refresh_from_db()  
+            # update() sends no post_save, so a view doesn't invalidate the seller's cached events
+            Event.objects.filter(pk=event.pk).update(view_count=F('view_count') + 1)
+            event.refresh_from_db(fields=['view_count'])
             
             serializer = EventSerializer(event, context={'request': request})
             return Response(serializer.data, status=status.HTTP_200_OK)
@@ -367,9 +563,8 @@ class ReviewListPagination(PageNumberPagination):
             'results': data
         })
 
-class ReviewCreateThrottle(UserRateThrottle):
-    scope = 'review_create'
-    rate = '3/day'
+class ReviewCreateThrottle(SharedUserRateThrottle):
+    scope = 'review-create'
 
 
 class ReviewListView(APIView):
@@ -413,6 +608,122 @@ class ReviewListView(APIView):
             )
 
 
+class ReviewBatchListView(APIView):
+    """Latest approved reviews for several events in a single query"""
+    permission_classes = [AllowAny]
+    max_events = 20
+    default_per_event = 3
+    max_per_event = 20
+
+    def get(self, request, *args, **kwargs):
+        raw_ids = request.query_params.get('event_ids', '')
+        try:
+            event_ids = list(dict.fromkeys(int(pk) for pk in raw_ids.split(',') if pk.strip()))
+        except ValueError:
+            return Response(
+                {"event_ids": "Must be a comma separated list of event IDs."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if not event_ids:
+            return Response({"event_ids": "This parameter is required."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(event_ids) > self.max_events:
+            return Response(
+                {"event_ids": f"You can request reviews for at most {self.max_events} events."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            per_event = int(request.query_params.get('limit', self.default_per_event))
+        except ValueError:
+            return Response({"limit": "Must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+        per_event = max(1, min(per_event, self.max_per_event))
+
+        try:
+            reviews = Review.objects.filter(
+                event_id__in=event_ids,
+                is_approved=True
+            ).select_related('user', 'event').annotate(
+                row_number=Window(
+                    expression=RowNumber(),
+                    partition_by=[F('event_id')],
+                    order_by=[F('created_at').desc(), F('id').desc()]
+                )
+            ).filter(row_number__lte=per_event).order_by('event_id', 'row_number')
+
+            data = {str(pk): [] for pk in event_ids}
+            serializer = ReviewSerializer(reviews, many=True, context={'request': request})
+            for review in serializer.data:
+                if review is not None:
+                    data[review['event_id']].append(review)
+            return Response(data, status=status.HTTP_200_OK)
+
+        except Exception as e:
+            logger.error(f"Error retrieving batch reviews: {str(e)}", exc_info=True)
+            return Response(
+                {"detail": "An error occurred while retrieving reviews."},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class ReviewSearchView(APIView):
+    """Full-text search over the reviews of a seller's own event"""
+    permission_classes = [IsAuthenticated]
+    default_limit = 20
+    max_limit = 100
+
+    def get_event(self, pk):
+        try:
+            return Event.objects.select_related('user').get(pk=pk)
+        except Event.DoesNotExist:
+            raise Http404
+
+    def get(self, request, event_pk, *args, **kwargs):
+        try:
+            event = self.get_event(event_pk)
+
+            if event.user != request.user and not request.user.is_staff:
+                return Response(
+                    {"detail": "You can only search reviews of your own events."},
+                    status=status.HTTP_403_FORBIDDEN
+                )
+
+            query = request.query_params.get('q', '').strip()
+            if len(query) < 2:
+                return Response(
+                    {"q": "Search query must be at least 2 characters."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            try:
+                limit = int(request.query_params.get('limit', self.default_limit))
+            except ValueError:
+                return Response({"limit": "Must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+            limit = max(1, min(limit, self.max_limit))
+
+            matches = search_event_reviews(event, query, limit=limit, approved_only=False)
+            results = []
+            for review, highlight, rank in matches:
+                review_data = ReviewSerializer(review, context={'request': request}).data
+                review_data['highlight'] = highlight
+                review_data['rank'] = rank
+                results.append(review_data)
+
+            return Response({'count': len(results), 'results': results}, status=status.HTTP_200_OK)
+
+        except Http404:
+            return Response(
+                {"detail": "Event not found."},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        except Exception as e:
+            logger.error(f"Error searching reviews: {str(e)}", exc_info=True)
+            return Response(
+                {"detail": "An error occurred while searching reviews."},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
 class ReviewCreateView(APIView):
     permission_classes = [IsAuthenticated]
     throttle_classes = [ReviewCreateThrottle]
@@ -533,6 +844,18 @@ class ReviewDeleteView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+# cache statistics views
+class CacheStatsView(APIView):
+    """Per-tier hit ratios of this worker's two-tier caches since it started"""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        stats = {
+            alias: caches[alias].stats()
+            for alias in settings.CACHES if hasattr(caches[alias], 'stats')
+        }
+        return Response(stats, status=status.HTTP_200_OK)
+
 # dashboards views         
 class DashboardView(APIView):
     permission_classes = [IsAuthenticated]
@@ -1,7 +1,23 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from django.utils import timezone
 from django.utils.html import format_html
-from .models import User
+from .authentication import invalidate_cached_user
+from .models import User, OutgoingEmail
+from utils.images import variant_urls
+
+def update_users(queryset, **fields):
+    """
+    queryset.update() that also drops the users from the JWT cache, which
+    post_save would otherwise do. They are dropped after the update (and
+    again on commit), so a request in between can't cache the old rows.
+    """
+    user_ids = list(queryset.values_list('pk', flat=True))
+    updated = queryset.update(**fields)
+    for user_id in user_ids:
+        invalidate_cached_user(user_id)
+    return updated
+
 
 class CustomUserAdmin(UserAdmin):
     model = User
@@ -29,7 +45,7 @@ class CustomUserAdmin(UserAdmin):
         if obj.profile_image:
             return format_html(
                 '<img src="{}" style="width: 30px; height: 30px; border-radius: 50%;"/>',
-                obj.profile_image.url
+                variant_urls(None, obj.profile_image_variants).get('thumb', obj.profile_image.url)
             )
         return "No Image"
     profile_image_display.short_description = 'Profile'
@@ -67,13 +83,6 @@ class CustomUserAdmin(UserAdmin):
                 'date_joined'
             )
         }),
-        ('Verification', {
-            'fields': (
-                'otp', 
-                'token_created_at'
-            ),
-            'classes': ('collapse',) 
-        }),
     )
 
     add_fieldsets = (
@@ -128,23 +137,44 @@ class CustomUserAdmin(UserAdmin):
     ]
     
     def mark_as_verified(self, request, queryset):
-        updated = queryset.update(is_verified=True)
+        updated = update_users(queryset, is_verified=True)
         self.message_user(request, f"{updated} users were marked as verified.")
     mark_as_verified.short_description = "Mark selected users as verified"
     
     def mark_as_unverified(self, request, queryset):
-        updated = queryset.update(is_verified=False)
+        updated = update_users(queryset, is_verified=False)
         self.message_user(request, f"{updated} users were marked as unverified.")
     mark_as_unverified.short_description = "Mark selected users as unverified"
     
     def activate_users(self, request, queryset):
-        updated = queryset.update(is_active=True)
+        updated = update_users(queryset, is_active=True)
         self.message_user(request, f"{updated} users were activated.")
     activate_users.short_description = "Activate selected users"
     
     def deactivate_users(self, request, queryset):
-        updated = queryset.update(is_active=False)
+        updated = update_users(queryset, is_active=False)
         self.message_user(request, f"{updated} users were deactivated.")
     deactivate_users.short_description = "Deactivate selected users"
 
-admin.site.register(User, CustomUserAdmin)
\ No newline at end of file
+admin.site.register(User, CustomUserAdmin)
+
+
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'recipients', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('subject', 'to')
+    readonly_fields = ('created_at', 'sent_at', 'last_error')
+    actions = ['retry_now']
+
+    def recipients(self, obj):
+        return ', '.join(obj.to)
+    recipients.short_description = 'To'
+
+    def retry_now(self, request, queryset):
+        updated = queryset.exclude(status=OutgoingEmail.STATUS_SENT).update(
+            status=OutgoingEmail.STATUS_PENDING, next_attempt_at=timezone.now()
+        )
+        self.message_user(request, f"{updated} emails were queued for another attempt.")
+    retry_now.short_description = "Retry selected emails now"
+
+admin.site.register(OutgoingEmail, OutgoingEmailAdmin)
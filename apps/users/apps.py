@@ -3,4 +3,9 @@ from django.apps import AppConfig
 class UsersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.users'
-    verbose_name = 'Users'
\ No newline at end of file
+    verbose_name = 'Users'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .emails import warm_email_templates
+        warm_email_templates()
@@ -0,0 +1,65 @@
+import copy
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+def _cache():
+    # Normally the two-tier cache: users are read from process memory, and
+    # invalidations reach every process through Redis
+    return caches[getattr(settings, 'JWT_USER_CACHE', 'default')]
+
+
+def _cache_key(user_id):
+    return f"jwt-user:{user_id}"
+
+
+def get_cached_user(user_id):
+    user = _cache().get(_cache_key(user_id))
+    # Every request gets its own instance, views are free to modify it
+    return copy.copy(user) if user is not None else None
+
+
+def cache_user(user):
+    key = _cache_key(getattr(user, api_settings.USER_ID_FIELD))
+    _cache().set(key, copy.copy(user), getattr(settings, 'JWT_USER_CACHE_TTL', 300))
+
+
+def invalidate_cached_user(user_id):
+    """
+    Forget a user now and again once the current transaction commits, so a
+    request that read the old row in between can't keep it cached.
+    """
+    def invalidate():
+        _cache().delete(_cache_key(user_id))
+
+    invalidate()
+    transaction.on_commit(invalidate)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that resolves the token's user from JWT_USER_CACHE
+    instead of a User SELECT on every request. Entries are dropped whenever the user
+    is saved or deleted, which covers deactivation and password changes.
+    """
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        user = get_cached_user(user_id) if user_id is not None else None
+        if user is None:
+            user = super().get_user(validated_token)
+            cache_user(user)
+            return user
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+        return user
@@ -0,0 +1,144 @@
+import logging
+import re
+from functools import lru_cache
+from django.conf import settings
+from django.template.loader import render_to_string
+from django.utils.html import escape
+
+logger = logging.getLogger(__name__)
+
+# Per-message values are rendered into the compiled templates as \0name\0 markers
+PLACEHOLDER = re.compile('\x00(\\w+)\x00')
+
+STYLE_BLOCK = re.compile(r'<style[^>]*>(.*?)</style>', re.S | re.I)
+CSS_RULE = re.compile(r'([^{}]+)\{([^{}]*)\}')
+OPENING_TAG = re.compile(r'<([a-zA-Z][a-zA-Z0-9]*)\b([^>]*?)(/?)>')
+CLASS_ATTR = re.compile(r'\bclass="([^"]*)"')
+STYLE_ATTR = re.compile(r'\sstyle="([^"]*)"')
+SIMPLE_SELECTOR = re.compile(r'^([a-zA-Z][a-zA-Z0-9]*)?(?:\.([\w-]+))?$')
+
+OTP_TEXT = """Hello {user_email},
+
+Thank you for registering with {site_name}!
+
+Your verification code is: {otp}
+
+This code will expire in {expiry_minutes} minutes.
+
+If you didn't request this code, please ignore this email.
+
+Regards,
+The {site_name} Team"""
+
+PASSWORD_RESET_TEXT = """Hello {user_email},
+
+You requested a password reset for your {site_name} account.
+
+Your password reset code is: {otp}
+
+This code will expire in {expiry_minutes} minutes.
+
+If you didn't request this password reset, please ignore this email.
+
+Regards,
+The {site_name} Team"""
+
+EMAILS = {
+    'otp': ("{site_name} - Email Verification Code", "emails/otp_email.html", OTP_TEXT),
+    'password_reset': ("{site_name} - Password Reset Code", "emails/password_reset_email.html", PASSWORD_RESET_TEXT),
+}
+PER_MESSAGE_FIELDS = ('user_email', 'otp')
+
+
+def inline_css(html):
+    """
+    Copy the rules of the <style> blocks onto the matching elements' style
+    attributes, which is what most mail clients render. Only tag, .class
+    and tag.class selectors are inlined; other rules stay in a <style> block.
+    """
+    rules, leftover = [], []
+    for block in STYLE_BLOCK.findall(html):
+        for selectors, declarations in CSS_RULE.findall(block):
+            declarations = '; '.join(d.strip() for d in declarations.split(';') if d.strip())
+            for selector in selectors.split(','):
+                match = SIMPLE_SELECTOR.match(selector.strip())
+                if match and any(match.groups()):
+                    rules.append((match.group(1), match.group(2), declarations))
+                else:
+                    leftover.append(f"{selector.strip()} {{ {declarations} }}")
+    # Class selectors are more specific, so their declarations come later and win
+    rules.sort(key=lambda rule: rule[1] is not None)
+
+    def apply(match):
+        tag, attributes, self_closing = match.groups()
+        class_match = CLASS_ATTR.search(attributes)
+        classes = set(class_match.group(1).split()) if class_match else set()
+        styles = [
+            declarations for rule_tag, rule_class, declarations in rules
+            if (rule_tag is None or rule_tag.lower() == tag.lower()) and (rule_class is None or rule_class in classes)
+        ]
+        style_match = STYLE_ATTR.search(attributes)
+        if style_match:
+            styles.append(style_match.group(1))
+            attributes = STYLE_ATTR.sub('', attributes)
+        if styles:
+            attributes += f' style="{"; ".join(styles)}"'
+        return f"<{tag}{attributes}{self_closing}>"
+
+    body = STYLE_BLOCK.sub('', html)
+    body = OPENING_TAG.sub(apply, body)
+    if leftover:
+        body = body.replace('</head>', f"<style>{' '.join(leftover)}</style></head>", 1)
+    return body
+
+
+class CompiledTemplate:
+    """A rendered template split around its per-message placeholders, so rendering is one join"""
+
+    def __init__(self, text):
+        self.parts = PLACEHOLDER.split(text)
+
+    def render(self, values):
+        parts = self.parts[:]
+        parts[1::2] = [values[name] for name in parts[1::2]]
+        return ''.join(parts)
+
+
+@lru_cache(maxsize=None)
+def _compile(kind, site_name, expiry_minutes):
+    subject, template_name, text = EMAILS[kind]
+    context = {
+        'site_name': site_name,
+        'expiry_minutes': expiry_minutes,
+        **{name: f'\x00{name}\x00' for name in PER_MESSAGE_FIELDS},
+    }
+    return (
+        subject.format(**context),
+        CompiledTemplate(text.format(**context)),
+        CompiledTemplate(inline_css(render_to_string(template_name, context))),
+    )
+
+
+def compiled_email(kind):
+    """Subject and compiled text/HTML bodies of an email, built once per process and settings"""
+    return _compile(kind, settings.SITE_NAME, settings.OTP_EXPIRY_MINUTES)
+
+
+def render_email(kind, user_email, otp):
+    """(subject, text body, HTML body) of the `kind` email for one recipient"""
+    subject, text, html = compiled_email(kind)
+    values = {'user_email': user_email, 'otp': otp}
+    return (
+        subject,
+        text.render(values),
+        html.render({name: escape(value) for name, value in values.items()}),
+    )
+
+
+def warm_email_templates():
+    """Compile the emails at startup; one that fails here is compiled again on its first send"""
+    for kind in EMAILS:
+        try:
+            compiled_email(kind)
+        except Exception as e:
+            logger.warning(f"Could not compile the {kind} email at startup: {str(e)}")
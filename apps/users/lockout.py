@@ -0,0 +1,85 @@
+import time
+from django.conf import settings
+from django.core.cache import caches
+
+LOGIN = 'login'
+OTP = 'otp'
+
+ACCOUNT = 'account'
+IP = 'ip'
+
+
+def _cache():
+    return caches[getattr(settings, 'AUTH_LOCKOUT_CACHE', 'default')]
+
+
+def _setting(name, default):
+    return getattr(settings, f'AUTH_LOCKOUT_{name}', default)
+
+
+def _subjects(email, ip):
+    subjects = []
+    if email:
+        subjects.append((ACCOUNT, email.lower()))
+    if ip:
+        subjects.append((IP, ip))
+    return subjects
+
+
+def _lock_key(scope, kind, subject):
+    return f"auth-locked:{scope}:{kind}:{subject}"
+
+
+def locked_for(scope, email, ip):
+    """Seconds until email and ip may try again; 0 when neither is locked out. One cache read."""
+    keys = [_lock_key(scope, kind, subject) for kind, subject in _subjects(email, ip)]
+    until = max(_cache().get_many(keys).values(), default=0)
+    return max(0, int(until - time.time() + 0.999))
+
+
+def _incr(cache, key, timeout):
+    cache.add(key, 0, timeout)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Expired between add() and incr()
+        cache.set(key, 1, timeout)
+        return 1
+
+
+def record_failure(scope, email, ip):
+    """
+    Count a failed attempt against the account and the IP. When either's
+    failures over the sliding AUTH_LOCKOUT_WINDOW reach its limit, it is
+    locked out for AUTH_LOCKOUT_BASE_SECONDS, doubling with every lockout
+    that follows within AUTH_LOCKOUT_RESET_SECONDS.
+    """
+    cache = _cache()
+    window = _setting('WINDOW', 900)
+    limits = {ACCOUNT: _setting('ACCOUNT_LIMIT', 5), IP: _setting('IP_LIMIT', 20)}
+    now = time.time()
+    current, elapsed = divmod(now, window)
+
+    for kind, subject in _subjects(email, ip):
+        counter = f"auth-failures:{scope}:{kind}:{subject}"
+        failures = _incr(cache, f"{counter}:{int(current)}", window * 2)
+        # Sliding window: the previous fixed window counts in proportion to its overlap
+        previous = cache.get(f"{counter}:{int(current) - 1}", 0)
+        if failures + previous * (1 - elapsed / window) < limits[kind]:
+            continue
+
+        level = _incr(cache, f"auth-lock-level:{scope}:{kind}:{subject}", _setting('RESET_SECONDS', 86400))
+        duration = min(_setting('BASE_SECONDS', 60) * 2 ** (level - 1), _setting('MAX_SECONDS', 3600))
+        cache.set(_lock_key(scope, kind, subject), now + duration, duration)
+        cache.delete_many([f"{counter}:{int(current)}", f"{counter}:{int(current) - 1}"])
+
+
+def clear_failures(scope, email):
+    """Forget the account's failures after a successful attempt; the IP's stay counted"""
+    cache = _cache()
+    subject = email.lower()
+    current = int(time.time() // _setting('WINDOW', 900))
+    counter = f"auth-failures:{scope}:{ACCOUNT}:{subject}"
+    cache.delete_many([
+        f"{counter}:{current}", f"{counter}:{current - 1}", f"auth-lock-level:{scope}:{ACCOUNT}:{subject}",
+    ])
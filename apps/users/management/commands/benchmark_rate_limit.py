@@ -0,0 +1,62 @@
+import time
+from datetime import datetime, timedelta
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from utils.rate_limit import LocalRateLimiter, get_rate_limiter
+
+
+def timestamp_list_check(key, limit, period):
+    """The list-of-datetimes check_rate_limit this module used to have, kept for comparison"""
+    cache_key = f"rate-limit-benchmark:{key}"
+    now = datetime.now()
+    attempts = [ts for ts in cache.get(cache_key, []) if now - ts < timedelta(seconds=period)]
+    if len(attempts) >= limit:
+        return False
+    attempts.append(now)
+    cache.set(cache_key, attempts, timeout=period)
+    return True
+
+
+class Command(BaseCommand):
+    help = (
+        "Time rate limit checks per call: the old timestamp list in the default cache against "
+        "the sliding window counter and token bucket, locally and on the configured Redis"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--calls', type=int, default=20000)
+        parser.add_argument('--limit', type=int, default=1000, help="Hits allowed per period")
+        parser.add_argument('--period', type=int, default=3600)
+
+    def handle(self, *args, **options):
+        calls, limit, period = options['calls'], options['limit'], options['period']
+        local = LocalRateLimiter()
+        shared = get_rate_limiter()
+        cases = [
+            ("timestamp list (old)", lambda key: timestamp_list_check(key, limit, period)),
+            ("sliding window, local", lambda key: local.sliding_window(key, limit, period)),
+            ("token bucket, local", lambda key: local.token_bucket(key, limit, limit / period)),
+        ]
+        if self.redis_available(shared):
+            cases += [
+                ("sliding window, redis", lambda key: shared.sliding_window(key, limit, period)),
+                ("token bucket, redis", lambda key: shared.token_bucket(key, limit, limit / period)),
+            ]
+
+        for name, check in cases:
+            key = f"benchmark:{time.time_ns()}"
+            started = time.perf_counter()
+            for _ in range(calls):
+                check(key)
+            per_call = (time.perf_counter() - started) / calls * 1e6
+            self.stdout.write(f"{name:<24} {per_call:9.2f} us/call")
+            cache.delete(f"rate-limit-benchmark:{key}")
+
+    def redis_available(self, limiter):
+        if limiter.redis is None:
+            return False
+        try:
+            return limiter.redis.client.ping()
+        except limiter._redis_errors as e:
+            self.stderr.write(f"Skipping Redis: {str(e)}")
+            return False
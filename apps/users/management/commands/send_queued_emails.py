@@ -0,0 +1,54 @@
+import time
+from datetime import timedelta
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+from apps.users.models import OutgoingEmail
+from apps.users.outbox import claim_emails, deliver_emails
+
+
+class Command(BaseCommand):
+    help = (
+        "Send the emails queued in the outbox, retrying failures with exponential backoff. "
+        "Runs until stopped; use --once to drain the due emails and exit (e.g. from cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Exit once no emails are due")
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--interval', type=float, default=2, help="Seconds to wait when the outbox is empty")
+        parser.add_argument(
+            '--keep-sent', type=int, default=72,
+            help="Delete sent emails older than this many hours"
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        # Backends such as utils.mail.PooledSMTPBackend report send latencies
+        metrics = getattr(get_connection(), 'metrics', None)
+        try:
+            while True:
+                close_old_connections()
+                emails = claim_emails(options['batch_size'])
+                if emails:
+                    sent = deliver_emails(emails)
+                    total += sent
+                    self.stdout.write(f"Sent {sent} of {len(emails)} emails")
+                    if metrics:
+                        self.stdout.write(f"SMTP {metrics.snapshot()}")
+                    continue
+
+                self.purge_sent(options['keep_sent'])
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(f"Sent {total} emails"))
+
+    def purge_sent(self, hours):
+        OutgoingEmail.objects.filter(
+            status=OutgoingEmail.STATUS_SENT, sent_at__lt=timezone.now() - timedelta(hours=hours)
+        ).delete()
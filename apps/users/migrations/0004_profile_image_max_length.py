@@ -0,0 +1,19 @@
+# Generated by Django 5.1.4 on 2026-10-19 01:15
+
+import apps.users.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_user_profile_image_status'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='profile_image',
+            field=models.ImageField(blank=True, max_length=255, null=True, upload_to=apps.users.models.user_profile_upload_path),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.1.4 on 2026-10-19 01:20
+
+from django.db import migrations, models
+
+
+def convert_variant_entries(model_name, image_field):
+    """
+    Variants used to be stored as {label: name}. Entries become
+    {label: {'name': name}} and the rows are left for build_image_variants,
+    which records the variant and original sizes when it rebuilds them.
+    """
+    def convert(apps, schema_editor):
+        model = apps.get_model(*model_name.split('.'))
+        variants_field = f'{image_field}_variants'
+        stale = []
+        for row in model.objects.exclude(**{variants_field: {}}).only('pk', variants_field).iterator():
+            variants = getattr(row, variants_field)
+            if not any(isinstance(value, str) for label, value in variants.items() if label != 'source'):
+                continue
+            setattr(row, variants_field, {
+                label: {'name': value} if label != 'source' and isinstance(value, str) else value
+                for label, value in variants.items()
+            })
+            setattr(row, f'{image_field}_status', '')
+            stale.append(row)
+        model.objects.bulk_update(stale, [variants_field, f'{image_field}_status'], batch_size=500)
+    return convert
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_profile_image_max_length'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='profile_image_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='profile_image_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(convert_variant_entries('users.User', 'profile_image'), migrations.RunPython.noop),
+    ]
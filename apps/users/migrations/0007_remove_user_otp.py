@@ -0,0 +1,21 @@
+# Generated by Django 5.1.4 on 2026-10-19 01:37
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_outgoingemail'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='user',
+            name='otp',
+        ),
+        migrations.RemoveField(
+            model_name='user',
+            name='token_created_at',
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2026-10-19 02:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_remove_user_otp'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='profile_image_processing_since',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -1,7 +1,11 @@
 import os
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.utils import timezone
 from .manager import UserManager
+from utils.images import schedule_variants, PROCESSING_STATUS_CHOICES
+
+PROFILE_IMAGE_VARIANT_SIZES = {'thumb': 64, 'medium': 256}
 
 USER_ROLES = (
     ("admin", "Admin"),
@@ -10,9 +14,9 @@ USER_ROLES = (
 )
 
 def user_profile_upload_path(instance, filename):
-    first_name = instance.first_name or "unknown"
-    filename_base, ext = os.path.splitext(filename)
-    return f"profiles/{first_name}/{filename_base}{ext}" 
+    # The storage shards this into profiles/<ab>/<cd>/<sha256><ext>
+    _, ext = os.path.splitext(filename)
+    return f"profiles/avatar{ext.lower()}"
 
 class User(AbstractUser):
     username = None 
@@ -23,10 +27,13 @@ class User(AbstractUser):
     role = models.CharField(max_length=10, choices=USER_ROLES)
     mobile_no = models.CharField(max_length=20, blank=True)
     is_verified = models.BooleanField(default=False)
-    otp = models.CharField(max_length=6, blank=True, null=True)
     verification_token = models.CharField(max_length=100, blank=True, null=True)
-    token_created_at = models.DateTimeField(null=True, blank=True)
-    profile_image = models.ImageField(upload_to=user_profile_upload_path, blank=True, null=True)
+    profile_image = models.ImageField(upload_to=user_profile_upload_path, max_length=255, blank=True, null=True)
+    profile_image_variants = models.JSONField(default=dict, blank=True, editable=False)
+    profile_image_status = models.CharField(max_length=10, choices=PROCESSING_STATUS_CHOICES, blank=True, editable=False)
+    profile_image_processing_since = models.DateTimeField(null=True, blank=True, editable=False)
+    profile_image_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    profile_image_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
     
     accepted_terms = models.BooleanField(
         default=False,
@@ -41,3 +48,39 @@ class User(AbstractUser):
 
     def __str__(self):
         return f"{self.email} ({self.role})"
+
+    def save(self, *args, **kwargs):
+        """Queue resized avatar variants whenever a new profile image is stored"""
+        super().save(*args, **kwargs)
+        schedule_variants(self, 'profile_image', PROFILE_IMAGE_VARIANT_SIZES)
+
+
+class OutgoingEmail(models.Model):
+    """An email waiting in the outbox for the send_queued_emails worker"""
+    STATUS_PENDING = 'pending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    subject = models.CharField(max_length=255)
+    from_email = models.CharField(max_length=255)
+    to = models.JSONField(default=list)
+    text_body = models.TextField()
+    html_body = models.TextField(blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['next_attempt_at']
+        indexes = [models.Index(fields=['status', 'next_attempt_at'])]
+
+    def __str__(self):
+        return f"{self.subject} to {', '.join(self.to)} ({self.status})"
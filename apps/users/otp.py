@@ -0,0 +1,90 @@
+import hashlib
+import hmac
+import secrets
+import time
+from django.conf import settings
+from django.core.cache import caches
+
+PURPOSE_VERIFY = 'verify'
+PURPOSE_PASSWORD_RESET = 'password_reset'
+
+VALID = 'valid'
+INVALID = 'invalid'
+EXPIRED = 'expired'
+
+
+def _cache():
+    # Shared by every worker: a code issued by one must verify on another
+    return caches[getattr(settings, 'OTP_CACHE', 'default')]
+
+
+def _ttl():
+    return settings.OTP_EXPIRY_MINUTES * 60
+
+
+def _digest(*parts):
+    message = ':'.join(parts).encode()
+    return hmac.new(settings.SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()
+
+
+def _keys(purpose, email):
+    """Keys of the latest code's issue record and of its failed-attempt counter"""
+    account = _digest(purpose, email.lower())
+    return f"otp:{purpose}:{account}", f"otp-attempts:{purpose}:{account}"
+
+
+def _code_key(purpose, email, code):
+    # Only an HMAC of the code is stored, and it is the key itself: checking a
+    # code and consuming it is then one atomic delete
+    return f"otp-code:{purpose}:{_digest(purpose, email.lower(), code)}"
+
+
+def issue_otp(purpose, email):
+    """Generate a code for email and purpose, replacing any earlier one"""
+    cache = _cache()
+    issued_key, attempts_key = _keys(purpose, email)
+    code = f"{secrets.randbelow(1000000):06d}"
+    code_key = _code_key(purpose, email, code)
+
+    previous = cache.get(issued_key)
+    if previous:
+        cache.delete(previous['code_key'])
+    cache.set_many({
+        code_key: 1,
+        issued_key: {'code_key': code_key, 'issued_at': time.time()},
+        attempts_key: 0,
+    }, _ttl())
+    return code
+
+
+def resend_wait(purpose, email):
+    """Seconds until a new code may be sent for email and purpose"""
+    issued = _cache().get(_keys(purpose, email)[0])
+    if not issued:
+        return 0
+    cooldown = getattr(settings, 'OTP_RESEND_COOLDOWN', 60)
+    return max(0, int(issued['issued_at'] + cooldown - time.time()))
+
+
+def verify_otp(purpose, email, code):
+    """
+    Consume code if it is the current one for email and purpose. Returns
+    VALID, INVALID, or EXPIRED when there is no usable code (never issued,
+    timed out, or burnt after OTP_MAX_ATTEMPTS wrong guesses).
+    """
+    cache = _cache()
+    if cache.delete(_code_key(purpose, email, str(code))):
+        cache.delete_many(_keys(purpose, email))
+        return VALID
+
+    issued_key, attempts_key = _keys(purpose, email)
+    issued = cache.get(issued_key)
+    if not issued:
+        return EXPIRED
+    try:
+        attempts = cache.incr(attempts_key)
+    except ValueError:
+        attempts = 1
+    if attempts >= getattr(settings, 'OTP_MAX_ATTEMPTS', 5):
+        cache.delete_many([issued['code_key'], issued_key, attempts_key])
+    return INVALID
@@ -0,0 +1,95 @@
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.utils import timezone
+from .models import OutgoingEmail
+
+logger = logging.getLogger(__name__)
+
+MAX_RETRY_DELAY = 3600
+
+
+def queue_email(subject, text_body, to, html_body='', from_email=None):
+    """Store an email in the outbox; the send_queued_emails worker delivers it"""
+    return OutgoingEmail.objects.create(
+        subject=subject,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        to=list(to),
+        text_body=text_body,
+        html_body=html_body,
+    )
+
+
+def retry_delay(attempts):
+    """EMAIL_OUTBOX_RETRY_DELAY doubled for every failed attempt, capped at an hour"""
+    return timedelta(seconds=min(settings.EMAIL_OUTBOX_RETRY_DELAY * 2 ** (attempts - 1), MAX_RETRY_DELAY))
+
+
+def claim_emails(batch_size):
+    """
+    Lease up to batch_size emails that are due. Their next_attempt_at moves
+    past the lease, so other workers skip them while they are being sent.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        emails = list(
+            OutgoingEmail.objects.select_for_update(skip_locked=True)
+            .filter(status=OutgoingEmail.STATUS_PENDING, next_attempt_at__lte=now)
+            .order_by('next_attempt_at')[:batch_size]
+        )
+        if emails:
+            OutgoingEmail.objects.filter(pk__in=[email.pk for email in emails]).update(
+                next_attempt_at=now + timedelta(seconds=settings.EMAIL_OUTBOX_LEASE_SECONDS)
+            )
+    return emails
+
+
+def _build_message(email, connection):
+    message = EmailMultiAlternatives(
+        email.subject, email.text_body, email.from_email, email.to, connection=connection
+    )
+    if email.html_body:
+        message.attach_alternative(email.html_body, "text/html")
+    return message
+
+
+def _record_failure(email, error):
+    email.attempts += 1
+    email.last_error = str(error)
+    if email.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+        email.status = OutgoingEmail.STATUS_FAILED
+        logger.error(f"Giving up on email {email.pk} to {', '.join(email.to)} after {email.attempts} attempts: {str(error)}")
+    else:
+        email.next_attempt_at = timezone.now() + retry_delay(email.attempts)
+        logger.warning(f"Email {email.pk} to {', '.join(email.to)} failed, retrying at {email.next_attempt_at}: {str(error)}")
+    email.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at'])
+
+
+def deliver_emails(emails, connection=None):
+    """Send claimed emails over a single backend connection. Returns how many were sent."""
+    connection = connection or get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as e:
+        for email in emails:
+            _record_failure(email, e)
+        return 0
+
+    sent_ids = []
+    try:
+        for email in emails:
+            try:
+                connection.send_messages([_build_message(email, connection)])
+            except Exception as e:
+                _record_failure(email, e)
+            else:
+                sent_ids.append(email.pk)
+    finally:
+        connection.close()
+
+    OutgoingEmail.objects.filter(pk__in=sent_ids).update(
+        status=OutgoingEmail.STATUS_SENT, sent_at=timezone.now(), last_error=''
+    )
+    return len(sent_ids)
@@ -1,13 +1,13 @@
 from rest_framework import serializers
 from .models import User
+from .emails import render_email
+from .outbox import queue_email
+from .otp import issue_otp, PURPOSE_VERIFY, PURPOSE_PASSWORD_RESET
 from django.contrib.auth.hashers import make_password
-from django.core.mail import EmailMultiAlternatives
-from django.template.loader import render_to_string
 from django.conf import settings
-from django.utils import timezone
-import random
 import logging
 from apps.core.serializers import EventSerializer
+from utils.images import variant_urls, image_srcset
 
 # Initialize logger
 logger = logging.getLogger(__name__)
@@ -33,13 +33,17 @@ class UserSerializer(serializers.ModelSerializer):
         allow_null=True,
         help_text="User profile image"
     )
+    profile_image_variants = serializers.SerializerMethodField()
+    profile_image_srcset = serializers.SerializerMethodField()
     
     events = EventSerializer(many=True, read_only=True)
 
     class Meta:
         model = User
         fields = ['id', 'email', 'first_name', 'last_name', 'role', 'mobile_no', 
-                 'password', 'confirm_password', 'profile_image', 'accepted_terms', 'events']
+                 'password', 'confirm_password', 'profile_image', 'profile_image_variants',
+                 'profile_image_srcset', 'profile_image_width', 'profile_image_height', 'profile_image_status',
+                 'accepted_terms', 'events']
         extra_kwargs = {
             'email': {
                 'required': True,
@@ -66,6 +70,13 @@ class UserSerializer(serializers.ModelSerializer):
                 'help_text': "You must accept the terms and conditions"
             }
         }
+
+    def get_profile_image_variants(self, obj):
+        return variant_urls(self.context.get('request'), obj.profile_image_variants)
+
+    def get_profile_image_srcset(self, obj):
+        return image_srcset(self.context.get('request'), obj.profile_image, obj.profile_image_variants,
+                            obj.profile_image_width)
         
     def validate(self, attrs):
         errors = {}
@@ -101,15 +112,13 @@ class UserSerializer(serializers.ModelSerializer):
         validated_data.pop('confirm_password')
         validated_data['password'] = make_password(validated_data['password'])
 
-        validated_data['otp'] = str(random.randint(100000, 999999))
-        validated_data['token_created_at'] = timezone.now()
         validated_data['is_verified'] = False
 
         try:
             print("DEBUG: Creating user with data:", validated_data)
             user = super().create(validated_data)
             print("DEBUG: Created user:", user)
-            self._send_otp_email(user)
+            self._send_otp_email(user, issue_otp(PURPOSE_VERIFY, user.email))
             return user
         except Exception as e:
             print("ERROR:", e)  # <-- This should show the real error in your terminal
@@ -118,42 +127,17 @@ class UserSerializer(serializers.ModelSerializer):
                 {"error": "Account creation failed. Please try again later."}
             )
 
-    def _send_otp_email(self, user):
-        """Sends an HTML email with embedded CSS containing the OTP."""
+    def _send_otp_email(self, user, otp):
+        """Queues an HTML email with embedded CSS containing the OTP."""
         try:
-            subject = f"{settings.SITE_NAME} - Email Verification Code"
             from_email = f"{settings.SITE_NAME} <{settings.DEFAULT_FROM_EMAIL}>"
             to_email = [user.email]
+            subject, text_content, html_content = render_email('otp', user.email, otp)
 
-            context = {
-                'site_name': settings.SITE_NAME,
-                'user_email': user.email,
-                'otp': user.otp,
-                'expiry_minutes': settings.OTP_EXPIRY_MINUTES,
-            }
-
-            text_content = f"""
-Hello {user.email},
-
-Thank you for registering with {settings.SITE_NAME}!
-
-Your verification code is: {user.otp}
-
-This code will expire in {settings.OTP_EXPIRY_MINUTES} minutes.
-
-If you didn't request this code, please ignore this email.
+            # Delivered by the send_queued_emails worker, so SMTP latency stays out of the request
+            queue_email(subject, text_content, to_email, html_content, from_email)
 
-Regards,
-The {settings.SITE_NAME} Team
-            """
-
-            html_content = render_to_string("emails/otp_email.html", context)
-
-            email = EmailMultiAlternatives(subject, text_content.strip(), from_email, to_email)
-            email.attach_alternative(html_content, "text/html")
-            email.send()
-
-            logger.info(f"OTP email sent to {user.email}")
+            logger.info(f"OTP email queued for {user.email}")
 
         except Exception as e:
             logger.error(f"Failed to send OTP email to {user.email}: {str(e)}")
@@ -163,12 +147,8 @@ The {settings.SITE_NAME} Team
 
     def resend_otp(self, user):
         """Regenerate and send a new OTP to the user"""
-        user.otp = str(random.randint(100000, 999999))
-        user.token_created_at = timezone.now()
-        user.save()
-        
         try:
-            self._send_otp_email(user)
+            self._send_otp_email(user, issue_otp(PURPOSE_VERIFY, user.email))
             return True
         except Exception as e:
             logger.error(f"Failed to resend OTP to {user.email}: {str(e)}")
@@ -176,62 +156,83 @@ The {settings.SITE_NAME} Team
 
     def send_password_reset_otp(self, user):
         """Generate and send OTP for password reset"""
-        user.otp = str(random.randint(100000, 999999))
-        user.token_created_at = timezone.now()
-        user.save()
-        
         try:
-            self._send_password_reset_email(user)
+            self._send_password_reset_email(user, issue_otp(PURPOSE_PASSWORD_RESET, user.email))
             return True
         except Exception as e:
             logger.error(f"Failed to send password reset OTP to {user.email}: {str(e)}")
             return False
 
-    def _send_password_reset_email(self, user):
-        """Sends password reset email with OTP"""
+    def _send_password_reset_email(self, user, otp):
+        """Queues password reset email with OTP"""
         try:
-            subject = f"{settings.SITE_NAME} - Password Reset Code"
             from_email = f"{settings.SITE_NAME} <{settings.DEFAULT_FROM_EMAIL}>"
             to_email = [user.email]
+            subject, text_content, html_content = render_email('password_reset', user.email, otp)
 
-            context = {
-                'site_name': settings.SITE_NAME,
-                'user_email': user.email,
-                'otp': user.otp,
-                'expiry_minutes': settings.OTP_EXPIRY_MINUTES,
-            }
+            queue_email(subject, text_content, to_email, html_content, from_email)
+
+            logger.info(f"Password reset OTP email queued for {user.email}")
+
+        except Exception as e:
+            logger.error(f"Failed to send password reset email to {user.email}: {str(e)}")
+            raise
+        
+class UserSummarySerializer(serializers.ModelSerializer):
+    """Compact profile returned at login; a seller's events are only listed by ID"""
+    profile_image_variants = serializers.SerializerMethodField()
+    event_ids = serializers.SerializerMethodField()
 
-            text_content = f"""
-Hello {user.email},
+    class Meta:
+        model = User
+        fields = ['id', 'email', 'first_name', 'last_name', 'role', 'mobile_no', 'is_verified',
+                  'profile_image', 'profile_image_variants', 'event_ids']
+        read_only_fields = fields
 
-You requested a password reset for your {settings.SITE_NAME} account.
+    def get_profile_image_variants(self, obj):
+        return variant_urls(self.context.get('request'), obj.profile_image_variants)
 
-Your password reset code is: {user.otp}
+    def get_event_ids(self, obj):
+        if obj.role != 'seller':
+            return []
+        return list(obj.events.order_by('-created_at').values_list('id', flat=True))
 
-This code will expire in {settings.OTP_EXPIRY_MINUTES} minutes.
 
-If you didn't request this password reset, please ignore this email.
+class ProfileSerializer(serializers.ModelSerializer):
+    """The signed-in user without their events, which /core/events/mine/ lists"""
+    profile_image_variants = serializers.SerializerMethodField()
+    profile_image_srcset = serializers.SerializerMethodField()
 
-Regards,
-The {settings.SITE_NAME} Team
-            """
+    class Meta:
+        model = User
+        fields = ['id', 'email', 'first_name', 'last_name', 'role', 'mobile_no', 'is_verified',
+                  'profile_image', 'profile_image_variants', 'profile_image_srcset', 'profile_image_width',
+                  'profile_image_height', 'profile_image_status', 'accepted_terms']
+        read_only_fields = fields
 
-            html_content = render_to_string("emails/password_reset_email.html", context)
+    def get_profile_image_variants(self, obj):
+        return variant_urls(self.context.get('request'), obj.profile_image_variants)
 
-            email = EmailMultiAlternatives(subject, text_content.strip(), from_email, to_email)
-            email.attach_alternative(html_content, "text/html")
-            email.send()
+    def get_profile_image_srcset(self, obj):
+        return image_srcset(self.context.get('request'), obj.profile_image, obj.profile_image_variants,
+                            obj.profile_image_width)
 
-            logger.info(f"Password reset OTP email sent to {user.email}")
 
-        except Exception as e:
-            logger.error(f"Failed to send password reset email to {user.email}: {str(e)}")
-            raise
-        
 class UserUpdateSerializer(serializers.ModelSerializer):
+    profile_image_variants = serializers.SerializerMethodField()
+    profile_image_srcset = serializers.SerializerMethodField()
+
     class Meta:
         model = User
-        fields = ['email', 'first_name', 'last_name', 'mobile_no', 'profile_image']
+        fields = ['email', 'first_name', 'last_name', 'mobile_no', 'profile_image', 'profile_image_variants',
+                  'profile_image_srcset', 'profile_image_width', 'profile_image_height', 'profile_image_status']
         extra_kwargs = {
             'email': {'read_only': True},  
-        }
\ No newline at end of file
+        }
+
+    def get_profile_image_variants(self, obj):
+        return variant_urls(self.context.get('request'), obj.profile_image_variants)
+
+    def get_profile_image_srcset(self, obj):
+        return image_srcset(self.context.get('request'), obj.profile_image, obj.profile_image_variants,
+                            obj.profile_image_width)
\ No newline at end of file
@@ -0,0 +1,24 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from utils.images import stored_file_names, variants_updated
+from utils.storage import delete_files_on_commit
+from .authentication import invalidate_cached_user
+from .models import User
+
+
+@receiver(post_delete, sender=User)
+def delete_profile_image(sender, instance, **kwargs):
+    delete_files_on_commit(stored_file_names(instance, 'profile_image'))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_cached_user(sender, instance, **kwargs):
+    # Covers deactivation and password changes, which go through save()
+    invalidate_cached_user(instance.pk)
+
+
+@receiver(variants_updated, sender=User)
+def forget_cached_user_variants(sender, pk, **kwargs):
+    # The variant pool updates the avatar fields without a save()
+    invalidate_cached_user(pk)
@@ -1,21 +1,49 @@
 from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from .serializers import UserSerializer,UserUpdateSerializer
+from .serializers import UserSerializer, UserUpdateSerializer, UserSummarySerializer, ProfileSerializer
 from .models import User
-from django.utils import timezone
-from datetime import timedelta
+from . import lockout
+from .otp import verify_otp, resend_wait, PURPOSE_VERIFY, PURPOSE_PASSWORD_RESET, VALID, EXPIRED
 from django.core.exceptions import ValidationError
-from django.contrib.auth import authenticate
 from rest_framework_simplejwt.tokens import RefreshToken
 from utils.rate_limit import check_rate_limit
 from django.utils.decorators import method_decorator
 from rest_framework.permissions import IsAuthenticated
-from apps.core.serializers import EventSerializer
-from apps.core.models import Event
 import logging
 logger = logging.getLogger(__name__)
 
+
+def locked_out_response(wait):
+    return Response(
+        {"error": f"Too many failed attempts. Please try again in {wait} seconds."},
+        status=status.HTTP_429_TOO_MANY_REQUESTS,
+        headers={'Retry-After': str(wait)}
+    )
+
+
+def check_otp(purpose, request, email, otp):
+    """verify_otp() behind the OTP lockout; a Response to return instead when it fails"""
+    ip = request.META.get('REMOTE_ADDR')
+    wait = lockout.locked_for(lockout.OTP, email, ip)
+    if wait:
+        return locked_out_response(wait)
+
+    result = verify_otp(purpose, email, otp)
+    if result == VALID:
+        lockout.clear_failures(lockout.OTP, email)
+        return None
+    lockout.record_failure(lockout.OTP, email, ip)
+    if result == EXPIRED:
+        return Response(
+            {"error": "OTP has expired or was not requested. Please request a new one."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    return Response(
+        {"error": "Invalid OTP. Please try again."},
+        status=status.HTTP_400_BAD_REQUEST
+    )
+
 # register views
 class RegisterView(APIView):
     def post(self, request):
@@ -79,6 +107,11 @@ class VerifyOtpView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        # The code is checked and consumed in the cache before the users table is touched
+        failed = check_otp(PURPOSE_VERIFY, request, email, otp)
+        if failed:
+            return failed
+
         try:
             user = User.objects.get(email=email)
         except User.DoesNotExist:
@@ -87,37 +120,15 @@ class VerifyOtpView(APIView):
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        # Check if user is already verified
         if user.is_verified:
             return Response(
                 {"error": "Email is already verified."},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Check OTP expiration (e.g., 10 minutes)
-        if not user.token_created_at:
-            return Response(
-                {"error": "No OTP was generated for this user."},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
-        if timezone.now() > user.token_created_at + timedelta(minutes=10):
-            return Response(
-                {"error": "OTP has expired. Please request a new one."},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
-        if user.otp != otp:
-            return Response(
-                {"error": "Invalid OTP. Please try again."},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
         try:
             user.is_verified = True
-            user.otp = None
-            user.token_created_at = None
-            user.save()
+            user.save(update_fields=['is_verified'])
             
             return Response(
                 {"message": "Email verified successfully."},
@@ -136,7 +147,7 @@ class ResendOtpView(APIView):
         email = request.data.get("email")
 
         # Rate limit: 5 per hour per IP
-        if not check_rate_limit(ip, limit=5, period=3600):
+        if not check_rate_limit(f"resend-otp:{ip}", limit=5, period=3600):
             return Response(
                 {"error": "Too many OTP requests. Please try again later."},
                 status=status.HTTP_429_TOO_MANY_REQUESTS
@@ -154,7 +165,7 @@ class ResendOtpView(APIView):
             return Response({"error": "Email already verified."}, status=status.HTTP_400_BAD_REQUEST)
 
         # Local OTP resend limit (1-minute cooldown)
-        if user.token_created_at and timezone.now() < user.token_created_at + timedelta(minutes=1):
+        if resend_wait(PURPOSE_VERIFY, user.email):
             return Response(
                 {"error": "Please wait at least 1 minute before requesting a new OTP."},
                 status=status.HTTP_429_TOO_MANY_REQUESTS
@@ -177,9 +188,16 @@ class LoginView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        try:
-            user = User.objects.get(email=email)
-        except User.DoesNotExist:
+        # Locked out accounts and IPs are turned away before any query or password hash
+        ip = request.META.get('REMOTE_ADDR')
+        wait = lockout.locked_for(lockout.LOGIN, email, ip)
+        if wait:
+            return locked_out_response(wait)
+
+        # One lookup and one password hash check; authenticate() would load the user again
+        user = User.objects.filter(email=email).first()
+        if user is None:
+            lockout.record_failure(lockout.LOGIN, email, ip)
             return Response(
                 {"error": "User with this email does not exist."},
                 status=status.HTTP_404_NOT_FOUND
@@ -191,31 +209,17 @@ class LoginView(APIView):
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        user = authenticate(request, email=email, password=password)
-
-        if user is None:
+        if not user.is_active or not user.check_password(password):
+            lockout.record_failure(lockout.LOGIN, email, ip)
             return Response(
                 {"error": "Invalid email or password.Please try again"},
                 status=status.HTTP_401_UNAUTHORIZED
             )
 
+        lockout.clear_failures(lockout.LOGIN, email)
         refresh = RefreshToken.for_user(user)
-        user_data = UserSerializer(user, context={'request': request}).data
-        
-        user_data.pop('password', None)
-        user_data.pop('confirm_password', None)
-        
-        if user.role == "seller":
-            events = Event.objects.filter(user=user).prefetch_related(
-                'services',
-                'gallery_images'
-            ).order_by('-created_at')
-            event_serializer = EventSerializer(
-                events, 
-                many=True, 
-                context={'request': request}
-            )
-            user_data["events"] = event_serializer.data
+        # Sellers load their events on demand from /core/events/mine/
+        user_data = UserSummarySerializer(user, context={'request': request}).data
 
         return Response({
             "message": "Login successful.",
@@ -229,8 +233,8 @@ class ProfileView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        user = request.user
-        serializer = UserSerializer(user)
+        # No events here: the user comes from the authentication cache, so this needs no query
+        serializer = ProfileSerializer(request.user, context={'request': request})
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     def put(self, request):
@@ -251,7 +255,7 @@ class ForgotPasswordView(APIView):
     def post(self, request):
         ip = request.META.get('REMOTE_ADDR', '')  
 
-        if not check_rate_limit(ip, limit=5, period=3600):
+        if not check_rate_limit(f"forgot-password:{ip}", limit=5, period=3600):
             return Response(
                 {"error": "Too many password reset requests. Please try again later."},
                 status=status.HTTP_429_TOO_MANY_REQUESTS
@@ -273,7 +277,7 @@ class ForgotPasswordView(APIView):
             )
 
         # Local cooldown: 1 min between OTP sends
-        if user.token_created_at and timezone.now() < user.token_created_at + timedelta(minutes=1):
+        if resend_wait(PURPOSE_PASSWORD_RESET, user.email):
             return Response(
                 {"error": "Please wait at least 1 minute before requesting a new password reset OTP."},
                 status=status.HTTP_429_TOO_MANY_REQUESTS
@@ -310,46 +314,29 @@ class ResetPasswordView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        try:
-            user = User.objects.get(email=email)
-        except User.DoesNotExist:
-            return Response(
-                {"error": "Invalid password reset request."},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
-        if not user.token_created_at:
+        # Validate password strength before the OTP is consumed
+        if len(new_password) < 8:
             return Response(
-                {"error": "No password reset OTP was generated for this user."},
+                {"error": "Password must be at least 8 characters long."},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        if timezone.now() > user.token_created_at + timedelta(minutes=10):
-            return Response(
-                {"error": "Password reset OTP has expired. Please request a new one."},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+        failed = check_otp(PURPOSE_PASSWORD_RESET, request, email, otp)
+        if failed:
+            return failed
 
-        if user.otp != otp:
+        try:
+            user = User.objects.get(email=email)
+        except User.DoesNotExist:
             return Response(
-                {"error": "Invalid OTP. Please try again."},
+                {"error": "Invalid password reset request."},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
         try:
-            # Validate password strength
-            if len(new_password) < 8:
-                return Response(
-                    {"error": "Password must be at least 8 characters long."},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-
             # Set the new password
             user.set_password(new_password)
-            # Clear the OTP fields
-            user.otp = None
-            user.token_created_at = None
-            user.save()
+            user.save(update_fields=['password'])
             
             return Response(
                 {"message": "Password reset successfully."},
@@ -0,0 +1,140 @@
+import mimetypes
+import os
+import re
+from email.utils import formatdate, parsedate_to_datetime
+from django.conf import settings
+from utils.storage import CONTENT_ADDRESSED_NAME
+
+BLOCK_SIZE = 64 * 1024
+
+RANGE_HEADER = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+def _read_range(file, length):
+    try:
+        while length > 0:
+            block = file.read(min(BLOCK_SIZE, length))
+            if not block:
+                break
+            length -= len(block)
+            yield block
+    finally:
+        file.close()
+
+
+class MediaFiles:
+    """
+    WSGI wrapper that serves MEDIA_URL straight from MEDIA_ROOT before the
+    request reaches Django, so image requests skip the middleware stack.
+
+    Responses carry an ETag and Last-Modified, answer conditional requests
+    with 304 and single byte ranges with 206. Full files go through
+    wsgi.file_wrapper, which lets gunicorn use sendfile(). With
+    MEDIA_ACCEL_REDIRECT_PREFIX set, nginx is told to send the file instead.
+    """
+
+    def __init__(self, application):
+        self.application = application
+        self.prefix = settings.MEDIA_URL
+        self.root = os.path.realpath(settings.MEDIA_ROOT)
+        self.max_age = getattr(settings, 'MEDIA_CACHE_MAX_AGE', 86400)
+        self.accel_redirect_prefix = getattr(settings, 'MEDIA_ACCEL_REDIRECT_PREFIX', None)
+        self.allowed_origins = set(getattr(settings, 'CORS_ALLOWED_ORIGINS', []))
+
+    def __call__(self, environ, start_response):
+        path_info = environ.get('PATH_INFO', '')
+        if not path_info.startswith(self.prefix):
+            return self.application(environ, start_response)
+        return self.serve(environ, start_response, path_info[len(self.prefix):])
+
+    def _respond(self, start_response, status, headers=(), body=b''):
+        start_response(status, [*headers, ('Content-Length', str(len(body)))])
+        return [body]
+
+    def serve(self, environ, start_response, name):
+        if environ['REQUEST_METHOD'] not in ('GET', 'HEAD'):
+            return self._respond(start_response, '405 Method Not Allowed', [('Allow', 'GET, HEAD')])
+
+        path = os.path.realpath(os.path.join(self.root, name))
+        if not path.startswith(self.root + os.sep) or not os.path.isfile(path):
+            return self._respond(start_response, '404 Not Found', [('Content-Type', 'text/plain')], b'Not Found')
+
+        stat = os.stat(path)
+        hashed = CONTENT_ADDRESSED_NAME.search(name)
+        etag = f'"{hashed.group(1)}"' if hashed else f'"{int(stat.st_mtime):x}-{stat.st_size:x}"'
+        content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        headers = [
+            ('ETag', etag),
+            ('Last-Modified', formatdate(stat.st_mtime, usegmt=True)),
+            ('Cache-Control', IMMUTABLE_CACHE_CONTROL if hashed else f'public, max-age={self.max_age}'),
+            ('Accept-Ranges', 'bytes'),
+        ]
+        origin = environ.get('HTTP_ORIGIN')
+        if origin in self.allowed_origins:
+            headers += [('Access-Control-Allow-Origin', origin), ('Vary', 'Origin')]
+
+        if self._not_modified(environ, etag, stat.st_mtime):
+            return self._respond(start_response, '304 Not Modified', headers)
+
+        if self.accel_redirect_prefix:
+            # nginx handles ranges and zero-copy delivery itself
+            headers += [('Content-Type', content_type), ('X-Accel-Redirect', self.accel_redirect_prefix + name)]
+            return self._respond(start_response, '200 OK', headers)
+
+        start, end = 0, stat.st_size - 1
+        status = '200 OK'
+        byte_range = self._requested_range(environ, etag, stat.st_size)
+        if byte_range == 'unsatisfiable':
+            headers.append(('Content-Range', f'bytes */{stat.st_size}'))
+            return self._respond(start_response, '416 Range Not Satisfiable', headers)
+        if byte_range:
+            start, end = byte_range
+            status = '206 Partial Content'
+            headers.append(('Content-Range', f'bytes {start}-{end}/{stat.st_size}'))
+
+        length = end - start + 1
+        start_response(status, headers + [('Content-Type', content_type), ('Content-Length', str(length))])
+        if environ['REQUEST_METHOD'] == 'HEAD':
+            return [b'']
+
+        file = open(path, 'rb')
+        file.seek(start)
+        if end == stat.st_size - 1 and 'wsgi.file_wrapper' in environ:
+            return environ['wsgi.file_wrapper'](file, BLOCK_SIZE)
+        return _read_range(file, length)
+
+    def _not_modified(self, environ, etag, mtime):
+        if_none_match = environ.get('HTTP_IF_NONE_MATCH')
+        if if_none_match:
+            return if_none_match.strip() == '*' or etag in [tag.strip() for tag in if_none_match.split(',')]
+        if_modified_since = environ.get('HTTP_IF_MODIFIED_SINCE')
+        if if_modified_since:
+            try:
+                return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def _requested_range(self, environ, etag, size):
+        """(start, end) for a single satisfiable byte range, None to send the whole file"""
+        match = RANGE_HEADER.match(environ.get('HTTP_RANGE', '').strip())
+        if not match or (environ.get('HTTP_IF_RANGE') not in (None, etag)):
+            return None
+
+        first, last = match.groups()
+        if not first and not last:
+            return None
+        if not first:
+            # Suffix range: the last N bytes
+            length = int(last)
+            if length == 0:
+                return 'unsatisfiable'
+            return max(size - length, 0), size - 1
+
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if start >= size or start > end:
+            return 'unsatisfiable'
+        return start, end
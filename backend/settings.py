@@ -40,7 +40,7 @@ CORS_ALLOWED_ORIGINS = [
 ]
 
 
-CORS_ALLOW_HEADERS = list(default_headers) + ["Authorization", "Content-Type"]
+CORS_ALLOW_HEADERS = list(default_headers) + ["Authorization", "Content-Type", "Upload-Offset"]
 
 CSRF_TRUSTED_ORIGINS = [
     "http://localhost:5173",
@@ -52,6 +52,22 @@ CSRF_TRUSTED_ORIGINS = [
 DATA_UPLOAD_MAX_MEMORY_SIZE = 1024 * 1024 * 10
 FILE_UPLOAD_MAX_MEMORY_SIZE = 1024 * 1024 * 10 
 
+# Resized copies of uploaded images (thumbnails, cards). Pillow >= 11.2 can write AVIF.
+IMAGE_VARIANT_FORMAT = 'WEBP'
+IMAGE_VARIANT_QUALITY = 80
+# Threads per process that build variants after the upload is committed; 0 builds them inline
+IMAGE_PROCESSING_WORKERS = int(os.getenv('IMAGE_PROCESSING_WORKERS', 2))
+# Jobs still processing after this many minutes died with their worker; build_image_variants redoes them
+IMAGE_PROCESSING_STALE_MINUTES = 30
+# Threads per process shared by requests to verify their uploaded images in parallel
+IMAGE_VALIDATION_WORKERS = int(os.getenv('IMAGE_VALIDATION_WORKERS', 4))
+
+# Resumable chunked uploads are streamed here; keep it on the same filesystem as MEDIA_ROOT
+# so finished uploads are moved into place instead of copied.
+CHUNKED_UPLOAD_ROOT = BASE_DIR / 'tmp_uploads'
+CHUNKED_UPLOAD_MAX_SIZE = 1024 * 1024 * 10
+CHUNKED_UPLOAD_MAX_CHUNK_SIZE = 1024 * 1024 * 2
+
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",
     'django.middleware.security.SecurityMiddleware', 
@@ -73,7 +89,7 @@ ROOT_URLCONF = 'backend.urls'
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
-        'DIRS': ['templates'],
+        'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
@@ -88,7 +104,10 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'backend.wsgi.application'
 
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+# The outbox worker sends through this backend; use django.core.mail.backends.console.EmailBackend
+# or filebased.EmailBackend (writes to EMAIL_FILE_PATH) to keep mail local in development
+EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', 'utils.mail.PooledSMTPBackend')
+EMAIL_FILE_PATH = BASE_DIR / 'tmp_emails'
 
 DATABASES = {
     'default': {
@@ -106,11 +125,12 @@ AUTH_USER_MODEL = 'users.User'
 REST_FRAMEWORK = {
     'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend'],
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.users.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [],
+    # Throttles in utils.throttling count in utils.rate_limit, shared through Redis
     'DEFAULT_THROTTLE_RATES': {
-        'review-create': '20/minute',
+        'review-create': '3/day',
     }
 }
 
@@ -121,15 +141,64 @@ AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator'},
 ]
 
+REDIS_URL = os.getenv('REDIS_URL') or None
+
+# 'tiered' (utils.cache.TwoTierCache) keeps hot read data in process memory in front of
+# Redis, and Redis pub/sub drops entries from every process's memory when they change
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
         'LOCATION': 'unique-rate-limit',
-    }
+    },
+    'tiered': {
+        'BACKEND': 'utils.cache.TwoTierCache',
+        'LOCATION': 'tiered',
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'L2': 'redis' if REDIS_URL else None,
+            'L1_MAX_ENTRIES': 10000,
+            'L1_TIMEOUT': 30,
+            'L2_RETRY': 30,
+        },
+    },
 }
+if REDIS_URL:
+    CACHES['redis'] = {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': REDIS_URL,
+        'KEY_PREFIX': 'cache',
+        'OPTIONS': {
+            'SOCKET_CONNECT_TIMEOUT': 0.1,
+            'SOCKET_TIMEOUT': 0.1,
+        },
+    }
+else:
+    # Without Redis, state every worker must see (OTPs, lockouts) lives in the database;
+    # the table is created by `manage.py createcachetable`
+    CACHES['database'] = {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'django_cache',
+    }
+# Alias for state that must be the same in every worker
+SHARED_CACHE = 'redis' if REDIS_URL else 'database'
 
 RATELIMIT_USE_CACHE = 'default'
 
+# utils.rate_limit: counters shared by all workers in Redis; while it is unreachable each
+# worker limits on its own and tries Redis again after RATELIMIT_REDIS_RETRY seconds
+RATELIMIT_REDIS_URL = REDIS_URL
+RATELIMIT_REDIS_TIMEOUT = 0.1
+RATELIMIT_REDIS_RETRY = 30
+
+# apps.users.authentication.CachedJWTAuthentication: where resolved users are kept, and for how long
+JWT_USER_CACHE = 'tiered'
+JWT_USER_CACHE_TTL = 300
+
+# apps.core.caching: a seller's serialized events, dropped whenever one of them changes;
+# the TTL bounds staleness of data that changes without signals (e.g. reviewers' names)
+SELLER_EVENTS_CACHE = 'tiered'
+SELLER_EVENTS_CACHE_TTL = 300
+
 AUTHENTICATION_BACKENDS = [
     'apps.users.backends.EmailBackend',
     'django.contrib.auth.backends.ModelBackend',
@@ -168,10 +237,40 @@ STATICFILES_DIRS = [BASE_DIR / 'staticfiles']
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Served by backend.media.MediaFiles. Content-addressed files are cached forever,
+# anything else for MEDIA_CACHE_MAX_AGE seconds.
+MEDIA_CACHE_MAX_AGE = 60 * 60 * 24
+# Set to an nginx `internal` location aliased to MEDIA_ROOT to let nginx send the bytes
+MEDIA_ACCEL_REDIRECT_PREFIX = os.getenv('MEDIA_ACCEL_REDIRECT_PREFIX') or None
+
+STORAGES = {
+    # Uploads are stored under their content hash, so duplicates share one file
+    'default': {
+        'BACKEND': 'utils.storage.ContentAddressedStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 OTP_EXPIRY_MINUTES = 15
+# apps.users.otp: codes live only in this cache, hashed, one per email and purpose
+OTP_CACHE = SHARED_CACHE
+OTP_MAX_ATTEMPTS = 5
+OTP_RESEND_COOLDOWN = 60
+
+# apps.users.lockout: failed logins / OTP checks per account and per IP allowed within a sliding
+# AUTH_LOCKOUT_WINDOW seconds before a lockout, which doubles with each repeat up to MAX_SECONDS
+AUTH_LOCKOUT_CACHE = SHARED_CACHE
+AUTH_LOCKOUT_WINDOW = 900
+AUTH_LOCKOUT_ACCOUNT_LIMIT = 5
+AUTH_LOCKOUT_IP_LIMIT = 20
+AUTH_LOCKOUT_BASE_SECONDS = 60
+AUTH_LOCKOUT_MAX_SECONDS = 3600
+AUTH_LOCKOUT_RESET_SECONDS = 86400
 
 EMAIL_HOST = os.getenv('EMAIL_HOST')
 EMAIL_PORT = int(os.getenv('EMAIL_PORT', 587))
@@ -179,4 +278,18 @@ EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS', 'True').lower() == 'true'
 EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD')
 DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL')
+EMAIL_TIMEOUT = 30
+
+# utils.mail.PooledSMTPBackend: authenticated connections kept open per process, how long one
+# may sit idle before it is checked with NOOP, and how many messages it carries before a reconnect
+EMAIL_POOL_SIZE = int(os.getenv('EMAIL_POOL_SIZE', 3))
+EMAIL_POOL_IDLE_TIMEOUT = 30
+EMAIL_POOL_MAX_MESSAGES = 100
+
+# Outbox read by `manage.py send_queued_emails`: failed sends are retried after
+# EMAIL_OUTBOX_RETRY_DELAY seconds, doubling each time, up to EMAIL_OUTBOX_MAX_ATTEMPTS
+EMAIL_OUTBOX_MAX_ATTEMPTS = 6
+EMAIL_OUTBOX_RETRY_DELAY = 30
+# How long a worker holds claimed emails before another worker may pick them up
+EMAIL_OUTBOX_LEASE_SECONDS = 300
 SITE_NAME = os.getenv('SITE_NAME')
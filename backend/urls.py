@@ -1,11 +1,10 @@
 from django.contrib import admin
 from django.urls import path, include
-from django.conf import settings
-from django.conf.urls.static import static
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path("api/", include("apps.users.urls")),
     # Core Features
     path("core/", include("apps.core.urls")),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+]
+# Media files are served by backend.media.MediaFiles, wrapped around the WSGI application
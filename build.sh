@@ -2,4 +2,5 @@
 
 pip install -r requirements.txt
 python manage.py migrate
+python manage.py createcachetable
 python manage.py collectstatic --noinput
\ No newline at end of file
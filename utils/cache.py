@@ -0,0 +1,363 @@
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from django.core.cache import caches
+from django.core.cache.backends.base import BaseCache, DEFAULT_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class LocalTTLCache:
+    """
+    Thread-safe in-process cache with a per-entry time to live. Once
+    maxsize entries are stored, the least recently used one is evicted.
+    """
+
+    def __init__(self, maxsize=1024, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class TierStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = {'l1': 0, 'l2': 0}
+        self.misses = {'l1': 0, 'l2': 0}
+
+    def record(self, tier, hit, count=1):
+        with self._lock:
+            (self.hits if hit else self.misses)[tier] += count
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                tier: {
+                    'hits': self.hits[tier],
+                    'misses': self.misses[tier],
+                    'hit_ratio': round(self.hits[tier] / total, 3) if (total := self.hits[tier] + self.misses[tier]) else None,
+                }
+                for tier in ('l1', 'l2')
+            }
+
+
+class _Tier:
+    """The process-wide state of one TwoTierCache: Django makes a backend instance per thread"""
+
+    def __init__(self, max_entries, timeout):
+        self.local = LocalTTLCache(maxsize=max_entries, ttl=timeout)
+        self.stats = TierStats()
+        self.origin = uuid.uuid4().hex
+        self.listener = None
+        self.l2_retry_at = 0
+        self.lock = threading.Lock()
+
+
+_tiers = {}
+_tiers_lock = threading.Lock()
+
+
+class TwoTierCache(BaseCache):
+    """
+    Cache backend with a bounded in-process LRU tier (L1) in front of
+    another cache alias (L2, e.g. a django-redis cache shared by all
+    workers). Reads try L1 and then L2, filling L1 on an L2 hit; writes go
+    to L2 and to this process's L1, whose entries live at most L1_TIMEOUT
+    seconds. Counters (incr/add) run on L2.
+
+    When L2 is a Redis cache, every write and delete is published on a
+    pub/sub channel and the other processes drop the key from their L1, so
+    an invalidation takes effect everywhere within milliseconds. If L2
+    fails, the cache runs on L1 alone for L2_RETRY seconds.
+
+    L1 hands out the stored object itself rather than a copy, so callers
+    must not modify values they get. Per-tier hit ratios come from stats().
+
+    OPTIONS: L2 (alias, or None for L1 only), L1_MAX_ENTRIES, L1_TIMEOUT, L2_RETRY.
+    """
+
+    def __init__(self, name, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.name = name or 'tiered'
+        self.l2_alias = options.get('L2')
+        self.l1_timeout = options.get('L1_TIMEOUT', 30)
+        self.l2_retry = options.get('L2_RETRY', 30)
+        self.channel = f"cache-invalidate:{self.name}"
+        with _tiers_lock:
+            if self.name not in _tiers:
+                _tiers[self.name] = _Tier(options.get('L1_MAX_ENTRIES', 10000), self.l1_timeout)
+            self._tier = _tiers[self.name]
+
+    @property
+    def l1(self):
+        return self._tier.local
+
+    def stats(self):
+        return self._tier.stats.snapshot()
+
+    def _l2(self):
+        """The L2 cache, or None when there is none or it recently failed"""
+        if not self.l2_alias or time.monotonic() < self._tier.l2_retry_at:
+            return None
+        l2 = caches[self.l2_alias]
+        self._ensure_listener(l2)
+        return l2
+
+    def _l2_failed(self, error):
+        logger.warning(f"Cache {self.name} running on L1 only, L2 failed: {str(error)}")
+        self._tier.l2_retry_at = time.monotonic() + self.l2_retry
+        # Invalidations published meanwhile won't reach this process
+        self.l1.clear()
+
+    # Pub/sub invalidation
+
+    def _redis(self, l2):
+        client = getattr(l2, 'client', None)
+        return client.get_client(write=True) if hasattr(client, 'get_client') else None
+
+    def _ensure_listener(self, l2):
+        tier = self._tier
+        if tier.listener is not None or self._redis(l2) is None:
+            return
+        with tier.lock:
+            if tier.listener is None:
+                tier.listener = threading.Thread(
+                    target=self._listen, args=(l2,), name=f"{self.channel}-listener", daemon=True
+                )
+                tier.listener.start()
+
+    def _subscriber(self, l2):
+        """
+        A client of its own for the listener: the cache's connections time
+        out after L2's SOCKET_TIMEOUT, which an idle subscription would hit
+        every time no invalidation arrives within it.
+        """
+        import redis
+        pool = self._redis(l2).connection_pool
+        kwargs = {**pool.connection_kwargs, 'socket_timeout': None, 'socket_keepalive': True}
+        return redis.Redis(connection_pool=redis.ConnectionPool(connection_class=pool.connection_class, **kwargs))
+
+    def _listen(self, l2):
+        subscriber = self._subscriber(l2)
+        delay = 1
+        disconnected = False
+        while True:
+            pubsub = subscriber.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(self.channel)
+                if disconnected:
+                    # Invalidations may have been missed while not subscribed
+                    self.l1.clear()
+                    disconnected = False
+                delay = 1
+                for message in pubsub.listen():
+                    origin, _, key = message['data'].decode().partition(':')
+                    if origin != self._tier.origin:
+                        self.l1.delete(key)
+            except Exception as e:
+                pubsub.close()
+                disconnected = True
+                logger.warning(f"Cache invalidation listener for {self.name} disconnected: {str(e)}")
+                time.sleep(delay)
+                delay = min(delay * 2, 60)
+
+    def _publish(self, l2, made_keys):
+        client = self._redis(l2)
+        if client is None or not made_keys:
+            return
+        pipeline = client.pipeline(transaction=False)
+        for made_key in made_keys:
+            pipeline.publish(self.channel, f"{self._tier.origin}:{made_key}")
+        pipeline.execute()
+
+    # Cache API
+
+    def _l1_set(self, made_key, value, timeout=DEFAULT_TIMEOUT):
+        expires_at = self.get_backend_timeout(timeout)
+        ttl = self.l1_timeout if expires_at is None else min(expires_at - time.time(), self.l1_timeout)
+        if ttl > 0:
+            self.l1.set(made_key, value, ttl=ttl)
+        else:
+            self.l1.delete(made_key)
+
+    def get(self, key, default=None, version=None):
+        value = self.l1.get(self.make_key(key, version=version), _MISSING)
+        if value is not _MISSING:
+            self._tier.stats.record('l1', True)
+            return value
+        return self.get_many([key], version=version).get(key, default)
+
+    def get_many(self, keys, version=None):
+        found, remaining = {}, {}
+        for key in keys:
+            made_key = self.make_key(key, version=version)
+            value = self.l1.get(made_key, _MISSING)
+            if value is _MISSING:
+                remaining[key] = made_key
+            else:
+                found[key] = value
+        stats = self._tier.stats
+        stats.record('l1', True, len(found))
+        stats.record('l1', False, len(remaining))
+
+        l2 = self._l2() if remaining else None
+        if l2 is not None:
+            try:
+                values = l2.get_many(list(remaining), version=version)
+            except Exception as e:
+                self._l2_failed(e)
+                return found
+            stats.record('l2', True, len(values))
+            stats.record('l2', False, len(remaining) - len(values))
+            for key, value in values.items():
+                self._l1_set(remaining[key], value)
+            found.update(values)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout=timeout, version=version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        made_keys = {key: self.make_key(key, version=version) for key in data}
+        l2 = self._l2()
+        if l2 is not None:
+            try:
+                l2.set_many(data, timeout=timeout, version=version)
+                self._publish(l2, list(made_keys.values()))
+            except Exception as e:
+                self._l2_failed(e)
+        for key, value in data.items():
+            self._l1_set(made_keys[key], value, timeout)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        l2 = self._l2()
+        if l2 is not None:
+            try:
+                added = l2.add(key, value, timeout=timeout, version=version)
+                if added:
+                    self._forget(l2, [key], version)
+                return added
+            except Exception as e:
+                self._l2_failed(e)
+        with self._tier.lock:
+            if self.has_key(key, version=version):
+                return False
+            self._l1_set(self.make_key(key, version=version), value, timeout)
+            return True
+
+    def incr(self, key, delta=1, version=None):
+        l2 = self._l2()
+        if l2 is not None:
+            try:
+                value = l2.incr(key, delta, version=version)
+                self._forget(l2, [key], version)
+                return value
+            except ValueError:
+                raise
+            except Exception as e:
+                self._l2_failed(e)
+        made_key = self.make_key(key, version=version)
+        with self._tier.lock:
+            value = self.l1.get(made_key, _MISSING)
+            if value is _MISSING:
+                raise ValueError(f"Key '{key}' not found")
+            self.l1.set(made_key, value + delta)
+            return value + delta
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        l2 = self._l2()
+        if l2 is not None:
+            try:
+                return l2.touch(key, timeout=timeout, version=version)
+            except Exception as e:
+                self._l2_failed(e)
+        made_key = self.make_key(key, version=version)
+        value = self.l1.get(made_key, _MISSING)
+        if value is _MISSING:
+            return False
+        self._l1_set(made_key, value, timeout)
+        return True
+
+    def _forget(self, l2, keys, version):
+        made_keys = [self.make_key(key, version=version) for key in keys]
+        for made_key in made_keys:
+            self.l1.delete(made_key)
+        if l2 is not None:
+            self._publish(l2, made_keys)
+
+    def delete(self, key, version=None):
+        made_key = self.make_key(key, version=version)
+        found = self.l1.get(made_key, _MISSING) is not _MISSING
+        l2 = self._l2()
+        if l2 is not None:
+            try:
+                found = l2.delete(key, version=version)
+                self._forget(l2, [key], version)
+                return bool(found)
+            except Exception as e:
+                self._l2_failed(e)
+        self._forget(None, [key], version)
+        return found
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        l2 = self._l2()
+        if l2 is not None:
+            try:
+                l2.delete_many(keys, version=version)
+                self._forget(l2, keys, version)
+                return
+            except Exception as e:
+                self._l2_failed(e)
+        self._forget(None, keys, version)
+
+    def has_key(self, key, version=None):
+        return self.get(key, _MISSING, version=version) is not _MISSING
+
+    def clear(self):
+        """Clears this process's L1 and the whole L2 alias"""
+        self.l1.clear()
+        l2 = self._l2()
+        if l2 is not None:
+            try:
+                l2.clear()
+            except Exception as e:
+                self._l2_failed(e)
@@ -0,0 +1,300 @@
+import base64
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.dispatch import Signal
+from django.utils import timezone
+from PIL import Image, ImageOps
+from .storage import delete_files_on_commit
+
+logger = logging.getLogger(__name__)
+
+VARIANT_FORMAT = getattr(settings, 'IMAGE_VARIANT_FORMAT', 'WEBP')
+VARIANT_QUALITY = getattr(settings, 'IMAGE_VARIANT_QUALITY', 80)
+PLACEHOLDER_SIZE = getattr(settings, 'IMAGE_PLACEHOLDER_SIZE', 16)
+PLACEHOLDER_QUALITY = 40
+
+# EXIF orientations that rotate the image by 90 or 270 degrees
+ORIENTATION_TAG = 0x0112
+ROTATED_ORIENTATIONS = (5, 6, 7, 8)
+
+STATUS_PENDING = 'pending'
+STATUS_PROCESSING = 'processing'
+STATUS_READY = 'ready'
+STATUS_FAILED = 'failed'
+PROCESSING_STATUS_CHOICES = [
+    (STATUS_PENDING, 'Pending'),
+    (STATUS_PROCESSING, 'Processing'),
+    (STATUS_READY, 'Ready'),
+    (STATUS_FAILED, 'Failed'),
+]
+
+# Sent with sender=model and pk whenever a row's image fields are changed with
+# QuerySet.update(), which sends no post_save; receivers drop what they cached of it
+variants_updated = Signal()
+
+_executor = None
+_validation_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.IMAGE_PROCESSING_WORKERS,
+            thread_name_prefix='image-variants'
+        )
+    return _executor
+
+
+def get_validation_executor():
+    """
+    Pool that requests share to verify uploaded images in parallel; Pillow
+    releases the GIL while it decodes. Kept apart from the variant pool so
+    uploads never wait behind background work.
+    """
+    global _validation_executor
+    if _validation_executor is None:
+        _validation_executor = ThreadPoolExecutor(
+            max_workers=settings.IMAGE_VALIDATION_WORKERS,
+            thread_name_prefix='image-validation'
+        )
+    return _validation_executor
+
+
+def _render_variant(image, max_size, quality=VARIANT_QUALITY):
+    variant = image.copy()
+    variant.thumbnail((max_size, max_size), Image.LANCZOS)
+    buffer = io.BytesIO()
+    # EXIF and other metadata are not copied into the re-encoded variant
+    variant.save(buffer, format=VARIANT_FORMAT, quality=quality, method=4)
+    return buffer.getvalue(), variant.size
+
+
+def render_placeholder(image):
+    """
+    A PLACEHOLDER_SIZE px preview of image as a data URI, a few hundred
+    bytes, meant to be inlined in payloads and stretched with a CSS blur
+    until the real image arrives.
+    """
+    content, _ = _render_variant(image, PLACEHOLDER_SIZE, quality=PLACEHOLDER_QUALITY)
+    return f"data:image/{VARIANT_FORMAT.lower()};base64,{base64.b64encode(content).decode('ascii')}"
+
+
+def _has_field(model, name):
+    return any(field.name == name for field in model._meta.concrete_fields)
+
+
+def image_dimensions(image_file):
+    """
+    (width, height) of an uploaded or stored image as displayed, read from the file
+    header without decoding the pixels. EXIF rotations swap the two.
+    """
+    was_closed = image_file.closed
+    try:
+        image_file.open('rb')
+        image_file.seek(0)
+        with Image.open(image_file) as image:
+            width, height = image.size
+            if image.getexif().get(ORIENTATION_TAG) in ROTATED_ORIENTATIONS:
+                width, height = height, width
+    except Exception as e:
+        logger.warning(f"Could not read image dimensions of {image_file.name}: {str(e)}")
+        return None, None
+    finally:
+        if was_closed:
+            image_file.close()
+        else:
+            image_file.seek(0)
+    return width, height
+
+
+def build_variants(field_file, sizes):
+    """
+    Render a resized copy of field_file for every {label: max_size} in sizes
+    and store them next to the original. Returns the variants mapping that
+    gets saved on the model, the displayed size of the original and its
+    placeholder: ({'source': <name>, <label>: {'name', 'width', 'height'}, ...}, (width, height), <data URI>)
+    """
+    if not field_file:
+        return {}, (None, None), ''
+
+    variants = {'source': field_file.name}
+    base, _ = os.path.splitext(field_file.name)
+    extension = VARIANT_FORMAT.lower()
+
+    try:
+        field_file.open('rb')
+        with Image.open(field_file) as source:
+            image = ImageOps.exif_transpose(source)
+            image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+
+        for label, max_size in sizes.items():
+            content, (width, height) = _render_variant(image, max_size)
+            name = field_file.storage.save(f"{base}__{label}.{extension}", ContentFile(content))
+            variants[label] = {'name': name, 'width': width, 'height': height}
+    finally:
+        field_file.close()
+
+    return variants, image.size, render_placeholder(image)
+
+
+def _update(rows, model, pk, changes):
+    updated = rows.update(**changes)
+    if updated:
+        variants_updated.send(sender=model, pk=pk)
+    return updated
+
+
+def process_variants(model, pk, image_field, sizes):
+    """
+    Build the variants of one stored image and record the outcome in
+    <image_field>_variants / <image_field>_status, together with the
+    placeholder on models that keep one, filling in the stored dimensions
+    of images uploaded before they existed. Runs on the worker pool,
+    or inline from the build_image_variants command.
+    """
+    variants_field, status_field = f'{image_field}_variants', f'{image_field}_status'
+    try:
+        instance = model.objects.filter(pk=pk).only(
+            'pk', image_field, variants_field, f'{image_field}_width', f'{image_field}_height'
+        ).first()
+        field_file = getattr(instance, image_field, None)
+        if not field_file:
+            return
+        previous = _variant_names(getattr(instance, variants_field))
+
+        # Only the row that still points at this file is updated, so a newer
+        # upload that landed while we were working is never overwritten.
+        current = model.objects.filter(pk=pk, **{image_field: field_file.name})
+        # The timestamp lets build_image_variants tell a job lost with its worker from a running one
+        _update(current, model, pk, {status_field: STATUS_PROCESSING, f'{image_field}_processing_since': timezone.now()})
+        try:
+            variants, (width, height), placeholder = build_variants(field_file, sizes)
+        except Exception as e:
+            logger.warning(f"Could not build image variants for {field_file.name}: {str(e)}")
+            _update(current, model, pk, {status_field: STATUS_FAILED})
+            return
+
+        changes = {variants_field: variants, status_field: STATUS_READY}
+        if not (getattr(instance, f'{image_field}_width') and getattr(instance, f'{image_field}_height')):
+            changes.update({f'{image_field}_width': width, f'{image_field}_height': height})
+        if _has_field(model, f'{image_field}_placeholder'):
+            changes[f'{image_field}_placeholder'] = placeholder
+        if _update(current, model, pk, changes):
+            delete_files_on_commit(previous, field_file.storage)
+        else:
+            # The image was replaced or deleted meanwhile; these variants belong to nobody
+            delete_files_on_commit(_variant_names(variants), field_file.storage)
+    except Exception as e:
+        logger.error(f"Image processing failed for {model.__name__} {pk}: {str(e)}", exc_info=True)
+
+
+def _process_in_worker(*args):
+    try:
+        process_variants(*args)
+    finally:
+        # Pool threads are long-lived; don't leave their DB connections open between jobs
+        connection.close()
+
+
+def enqueue_variants(model, pk, image_field, sizes):
+    """Hand the image to the worker pool once the surrounding transaction commits"""
+    def submit():
+        if settings.IMAGE_PROCESSING_WORKERS:
+            _get_executor().submit(_process_in_worker, model, pk, image_field, sizes)
+        else:
+            process_variants(model, pk, image_field, sizes)
+
+    transaction.on_commit(submit)
+
+
+def schedule_variants(instance, image_field, sizes):
+    """
+    Called after instance.save(): if the stored image changed, record its
+    dimensions, mark it pending and queue its variants for background processing.
+    """
+    variants_field, status_field = f'{image_field}_variants', f'{image_field}_status'
+    field_file = getattr(instance, image_field)
+    source = field_file.name if field_file else None
+    if (getattr(instance, variants_field) or {}).get('source') == source:
+        return
+
+    # Re-read what the row points at; the pool may have stored variants since this instance was loaded
+    model = type(instance)
+    previous = model.objects.filter(pk=instance.pk).values_list(variants_field, flat=True).first() or {}
+    if previous.get('source') == source:
+        setattr(instance, variants_field, previous)
+        return
+
+    width, height = image_dimensions(field_file) if source else (None, None)
+    changes = {
+        variants_field: {'source': source} if source else {},
+        status_field: STATUS_PENDING if source else '',
+        f'{image_field}_width': width,
+        f'{image_field}_height': height,
+    }
+    if _has_field(model, f'{image_field}_placeholder'):
+        # Cleared until the pool renders one for the new image
+        changes[f'{image_field}_placeholder'] = ''
+    for attr, value in changes.items():
+        setattr(instance, attr, value)
+    _update(model.objects.filter(pk=instance.pk), model, instance.pk, changes)
+    # The replaced image and its variants are no longer referenced by this row
+    delete_files_on_commit([previous.get('source'), *_variant_names(previous)], field_file.storage)
+
+    if source:
+        enqueue_variants(model, instance.pk, image_field, sizes)
+
+
+def _stored_variants(variants):
+    """The {label: {'name', 'width', 'height'}} entries of a variants mapping"""
+    return {label: variant for label, variant in (variants or {}).items() if label != 'source'}
+
+
+def _variant_names(variants):
+    return [variant['name'] for variant in _stored_variants(variants).values()]
+
+
+def stored_file_names(instance, image_field):
+    """Every media file instance.<image_field> owns: the original and its variants"""
+    field_file = getattr(instance, image_field)
+    names = _variant_names(getattr(instance, f'{image_field}_variants'))
+    if field_file:
+        names.append(field_file.name)
+    return names
+
+
+def variant_urls(request, variants):
+    """URLs for every stored variant keyed by label, absolute when a request is given"""
+    urls = {label: default_storage.url(variant['name']) for label, variant in _stored_variants(variants).items()}
+    if request:
+        urls = {label: request.build_absolute_uri(url) for label, url in urls.items()}
+    return urls
+
+
+def image_srcset(request, field_file, variants, width):
+    """
+    A srcset value listing every stored size of an image by its width,
+    smallest first: "<thumb url> 320w, <large url> 1280w, <original url> 2400w".
+    Built from the recorded widths only, so no file is opened. Variants that
+    aren't smaller than the original are left out in its favour.
+    """
+    if not field_file:
+        return ''
+    candidates = {}
+    for variant in _stored_variants(variants).values():
+        if not variant.get('width'):
+            continue
+        if not width or variant['width'] < width:
+            candidates.setdefault(variant['width'], default_storage.url(variant['name']))
+    if width:
+        candidates[width] = field_file.url
+    if request:
+        candidates = {w: request.build_absolute_uri(url) for w, url in candidates.items()}
+    return ', '.join(f"{url} {w}w" for w, url in sorted(candidates.items()))
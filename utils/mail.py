@@ -0,0 +1,167 @@
+import logging
+import smtplib
+import threading
+import time
+from collections import deque
+from django.conf import settings
+from django.core.mail.backends.smtp import EmailBackend
+
+logger = logging.getLogger(__name__)
+
+# Errors that mean the pooled connection is dead rather than the message being refused
+CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)
+
+
+class SMTPMetrics:
+    """Per-message send latency and connection counters of a process, kept for the last few messages"""
+
+    def __init__(self, window=1000):
+        self._lock = threading.Lock()
+        self.latencies = deque(maxlen=window)
+        self.sent = self.failed = self.connections_opened = self.reconnects = 0
+
+    def record(self, seconds, sent):
+        with self._lock:
+            self.latencies.append(seconds)
+            if sent:
+                self.sent += 1
+            else:
+                self.failed += 1
+
+    def count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def snapshot(self):
+        with self._lock:
+            latencies = sorted(self.latencies)
+            counters = {
+                'sent': self.sent,
+                'failed': self.failed,
+                'connections_opened': self.connections_opened,
+                'reconnects': self.reconnects,
+            }
+
+        def percentile(p):
+            return round(latencies[min(int(len(latencies) * p), len(latencies) - 1)] * 1000, 1) if latencies else None
+
+        return {**counters, 'p50_ms': percentile(0.5), 'p95_ms': percentile(0.95), 'max_ms': percentile(1)}
+
+
+class SMTPConnectionPool:
+    """Idle authenticated SMTP connections for one server and login, newest first"""
+
+    def __init__(self, size, idle_timeout):
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._idle = []
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                if not self._idle:
+                    return None
+                connection, released_at = self._idle.pop()
+            if time.monotonic() - released_at < self.idle_timeout:
+                return connection
+            # Idle long enough for the server to have hung up: check before reusing it
+            try:
+                if connection.noop()[0] == 250:
+                    return connection
+            except (smtplib.SMTPException, OSError):
+                pass
+            _quit(connection)
+
+    def release(self, connection):
+        """Keep connection for reuse; False when the pool is full and it should be closed"""
+        with self._lock:
+            if len(self._idle) >= self.size:
+                return False
+            self._idle.append((connection, time.monotonic()))
+            return True
+
+
+def _quit(connection):
+    try:
+        connection.quit()
+    except (smtplib.SMTPException, OSError):
+        connection.close()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+metrics = SMTPMetrics()
+
+
+class PooledSMTPBackend(EmailBackend):
+    """
+    SMTP backend that keeps up to EMAIL_POOL_SIZE authenticated connections
+    per process open between sends, so a burst of OTP emails doesn't cost a
+    TCP + TLS handshake and a login each. A connection is recycled after
+    EMAIL_POOL_MAX_MESSAGES messages, and a message that hits a dropped
+    connection is retried once on a fresh one. Latencies and counters are
+    collected in `metrics`.
+    """
+    metrics = metrics
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_messages = getattr(settings, 'EMAIL_POOL_MAX_MESSAGES', 100)
+
+    @property
+    def pool(self):
+        key = (self.host, self.port, self.username, self.use_tls, self.use_ssl)
+        with _pools_lock:
+            if key not in _pools:
+                _pools[key] = SMTPConnectionPool(
+                    getattr(settings, 'EMAIL_POOL_SIZE', 3),
+                    getattr(settings, 'EMAIL_POOL_IDLE_TIMEOUT', 30),
+                )
+            return _pools[key]
+
+    def open(self):
+        if self.connection:
+            return False
+        self.connection = self.pool.acquire()
+        if self.connection:
+            return True
+        opened = super().open()
+        if opened:
+            self.connection.messages_sent = 0
+            self.metrics.count('connections_opened')
+        return opened
+
+    def close(self):
+        """Hand the connection back to the pool instead of quitting it"""
+        if self.connection is None:
+            return
+        connection, self.connection = self.connection, None
+        if connection.messages_sent >= self.max_messages or not self.pool.release(connection):
+            _quit(connection)
+
+    def _reconnect(self):
+        connection, self.connection = self.connection, None
+        if connection is not None:
+            connection.close()
+        self.metrics.count('reconnects')
+        if super().open():
+            self.connection.messages_sent = 0
+            self.metrics.count('connections_opened')
+
+    def _send(self, email_message):
+        started = time.monotonic()
+        try:
+            try:
+                sent = super()._send(email_message)
+            except CONNECTION_ERRORS as e:
+                logger.warning(f"SMTP connection dropped, reconnecting: {str(e)}")
+                self._reconnect()
+                sent = bool(self.connection) and super()._send(email_message)
+        except Exception:
+            self.metrics.record(time.monotonic() - started, False)
+            raise
+        self.metrics.record(time.monotonic() - started, sent)
+        if sent:
+            self.connection.messages_sent += 1
+        return sent
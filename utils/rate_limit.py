@@ -1,19 +1,182 @@
-from django.core.cache import cache
-from datetime import datetime, timedelta
+import logging
+import math
+import threading
+import time
+from collections import namedtuple
+from django.conf import settings
+from utils.cache import LocalTTLCache
 
-def check_rate_limit(key: str, limit: int, period: int):
+logger = logging.getLogger(__name__)
+
+# retry_after is in seconds, 0 when allowed
+RateLimitResult = namedtuple('RateLimitResult', ['allowed', 'remaining', 'retry_after'])
+
+# KEYS: current window, previous window. ARGV: limit, weight of the previous window, key TTL
+SLIDING_WINDOW_SCRIPT = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+if previous * tonumber(ARGV[2]) + current >= tonumber(ARGV[1]) then
+    return {0, current, previous}
+end
+current = redis.call('INCR', KEYS[1])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return {1, current, previous}
+"""
+
+# KEYS: bucket. ARGV: capacity, tokens per second, now, cost. Returns tokens as a string to keep the fraction
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, tostring(tokens)}
+"""
+
+
+def _window(period, now):
+    """Index of the fixed window now falls in, and how much of the previous one still overlaps"""
+    index, elapsed = divmod(now, period)
+    return int(index), 1 - elapsed / period
+
+
+def _sliding_window_result(allowed, current, previous, limit, period, weight):
+    estimate = previous * weight + current
+    if allowed:
+        return RateLimitResult(True, max(0, math.floor(limit - estimate)), 0)
+    if current >= limit:
+        # Only the next window frees anything
+        retry_after = weight * period
+    else:
+        # The previous window's share decays until there is room for one more
+        retry_after = weight * period - (limit - current) / previous * period
+    return RateLimitResult(False, 0, max(retry_after, 0))
+
+
+def _token_bucket_result(allowed, tokens, cost, rate):
+    retry_after = 0 if allowed else (cost - tokens) / rate
+    return RateLimitResult(bool(allowed), math.floor(tokens), retry_after)
+
+
+class LocalRateLimiter:
+    """Per-process limiter: exact within one worker, each worker counting on its own"""
+
+    def __init__(self, maxsize=100000):
+        self._lock = threading.Lock()
+        # (window index, count, previous count) or (tokens, timestamp) per key
+        self._state = LocalTTLCache(maxsize=maxsize, ttl=86400)
+
+    def sliding_window(self, key, limit, period, now=None):
+        now = time.time() if now is None else now
+        index, weight = _window(period, now)
+        with self._lock:
+            window, current, previous = self._state.get(key) or (index, 0, 0)
+            if window != index:
+                previous = current if window == index - 1 else 0
+                current = 0
+            allowed = previous * weight + current < limit
+            if allowed:
+                current += 1
+            self._state.set(key, (index, current, previous), ttl=period * 2)
+        return _sliding_window_result(allowed, current, previous, limit, period, weight)
+
+    def token_bucket(self, key, capacity, rate, cost=1, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            tokens, ts = self._state.get(key) or (capacity, now)
+            tokens = min(capacity, tokens + max(0, now - ts) * rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._state.set(key, (tokens, now), ttl=math.ceil(capacity / rate) + 1)
+        return _token_bucket_result(allowed, tokens, cost, rate)
 
-    cache_key = f"rate-limit:{key}"
-    attempts = cache.get(cache_key, [])
 
-    # Remove expired timestamps
-    now = datetime.now()
-    valid_attempts = [ts for ts in attempts if now - ts < timedelta(seconds=period)]
+class RedisRateLimiter:
+    """Limiter shared by every worker; each check is one atomic Lua script call"""
 
-    if len(valid_attempts) >= limit:
-        return False
+    def __init__(self, client, prefix='rl'):
+        self.client = client
+        self.prefix = prefix
+        self._sliding_window = client.register_script(SLIDING_WINDOW_SCRIPT)
+        self._token_bucket = client.register_script(TOKEN_BUCKET_SCRIPT)
 
-    # Add current attempt and save
-    valid_attempts.append(now)
-    cache.set(cache_key, valid_attempts, timeout=period)
-    return True
+    def sliding_window(self, key, limit, period, now=None):
+        now = time.time() if now is None else now
+        index, weight = _window(period, now)
+        allowed, current, previous = self._sliding_window(
+            keys=[f"{self.prefix}:sw:{key}:{index}", f"{self.prefix}:sw:{key}:{index - 1}"],
+            args=[limit, weight, math.ceil(period * 2)],
+        )
+        return _sliding_window_result(allowed, int(current), int(previous), limit, period, weight)
+
+    def token_bucket(self, key, capacity, rate, cost=1, now=None):
+        now = time.time() if now is None else now
+        allowed, tokens = self._token_bucket(
+            keys=[f"{self.prefix}:tb:{key}"], args=[capacity, rate, now, cost],
+        )
+        return _token_bucket_result(allowed, float(tokens), cost, rate)
+
+
+class RateLimiter:
+    """
+    RedisRateLimiter on RATELIMIT_REDIS_URL, falling back to a
+    LocalRateLimiter when it isn't configured or can't be reached. After a
+    Redis error the local limiter is used for RATELIMIT_REDIS_RETRY seconds.
+    """
+
+    def __init__(self, redis_url=None):
+        self.local = LocalRateLimiter()
+        self.redis = None
+        self._retry_at = 0
+        if redis_url:
+            import redis
+            self._redis_errors = redis.RedisError
+            timeout = getattr(settings, 'RATELIMIT_REDIS_TIMEOUT', 0.1)
+            self.redis = RedisRateLimiter(
+                redis.Redis.from_url(redis_url, socket_timeout=timeout, socket_connect_timeout=timeout)
+            )
+
+    def _call(self, method, *args, **kwargs):
+        if self.redis is not None and time.monotonic() >= self._retry_at:
+            try:
+                return getattr(self.redis, method)(*args, **kwargs)
+            except self._redis_errors as e:
+                logger.warning(f"Rate limiting locally, Redis is unavailable: {str(e)}")
+                self._retry_at = time.monotonic() + getattr(settings, 'RATELIMIT_REDIS_RETRY', 30)
+        return getattr(self.local, method)(*args, **kwargs)
+
+    def sliding_window(self, key, limit, period):
+        """Allow at most limit hits per rolling period seconds, estimated from two fixed windows"""
+        return self._call('sliding_window', key, limit, period)
+
+    def token_bucket(self, key, capacity, rate, cost=1):
+        """Allow bursts of up to capacity hits, refilled at rate per second"""
+        return self._call('token_bucket', key, capacity, rate, cost)
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = RateLimiter(getattr(settings, 'RATELIMIT_REDIS_URL', None))
+        return _limiter
+
+
+def check_rate_limit(key: str, limit: int, period: int):
+    """True if one more hit for key stays within limit per rolling period seconds"""
+    return get_rate_limiter().sliding_window(f"rate-limit:{key}", limit, period).allowed
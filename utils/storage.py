@@ -0,0 +1,89 @@
+import hashlib
+import logging
+import os
+import re
+from django.apps import apps
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.files.utils import validate_file_name
+from django.db import transaction
+from django.db.models import F
+
+logger = logging.getLogger(__name__)
+
+# Trailing "/ab/cd" shard directories of a name that is already content addressed
+SHARD_SUFFIX = re.compile(r'(/[0-9a-f]{2}){2}$')
+# Names written by ContentAddressedStorage: .../ab/cd/<sha256>.<ext>
+CONTENT_ADDRESSED_NAME = re.compile(r'(?:^|/)[0-9a-f]{2}/[0-9a-f]{2}/([0-9a-f]{64})\.\w+$')
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Stores every file as <upload dir>/<ab>/<cd>/<sha256><ext>. Identical
+    uploads share one file on disk, counted in core.MediaBlob, and a file
+    is only removed once its last reference is deleted. Since a name never
+    changes content, its URL can be cached forever.
+    """
+
+    def hashed_name(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content_hash = digest.hexdigest()
+
+        directory = SHARD_SUFFIX.sub('', os.path.dirname(name).replace('\\', '/'))
+        extension = os.path.splitext(name)[1].lower()
+        return '/'.join(filter(None, [directory, content_hash[:2], content_hash[2:4], content_hash + extension]))
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+
+        name = self.hashed_name(name, content)
+        validate_file_name(name, allow_relative_path=True)
+        if not self.exists(name):
+            name = self._save(name, content)
+        self._add_reference(name)
+        return name
+
+    def delete(self, name):
+        if name and self._release_reference(name):
+            super().delete(name)
+
+    def _add_reference(self, name):
+        MediaBlob = apps.get_model('core', 'MediaBlob')
+        with transaction.atomic():
+            blob, created = MediaBlob.objects.select_for_update().get_or_create(name=name)
+            MediaBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + 1)
+
+    def _release_reference(self, name):
+        """Drop one reference; True when nothing points at the file anymore"""
+        MediaBlob = apps.get_model('core', 'MediaBlob')
+        with transaction.atomic():
+            blob = MediaBlob.objects.select_for_update().filter(name=name).first()
+            if blob is None:
+                # Files stored before content addressing aren't counted
+                return True
+            if blob.ref_count > 1:
+                MediaBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') - 1)
+                return False
+            blob.delete()
+            return True
+
+
+def _delete_files(names, storage):
+    for name in names:
+        try:
+            storage.delete(name)
+        except Exception as e:
+            logger.warning(f"Could not delete media file {name}: {str(e)}")
+
+
+def delete_files_on_commit(names, storage=None):
+    """Release media files once the transaction that dropped their references commits"""
+    names = [name for name in names if name]
+    if names:
+        storage = storage or default_storage
+        transaction.on_commit(lambda: _delete_files(names, storage))
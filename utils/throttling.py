@@ -0,0 +1,44 @@
+from rest_framework.throttling import AnonRateThrottle, ScopedRateThrottle, UserRateThrottle
+from utils.rate_limit import get_rate_limiter
+
+
+class SharedRateThrottleMixin:
+    """
+    Counts requests in utils.rate_limit's sliding window instead of a
+    per-key timestamp list in the default cache, so with Redis configured
+    every worker and node enforces the same limit with one atomic call.
+    Rates come from REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'][scope].
+    """
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.result = get_rate_limiter().sliding_window(self.key, self.num_requests, self.duration)
+        return self.result.allowed
+
+    def wait(self):
+        return self.result.retry_after
+
+
+class SharedUserRateThrottle(SharedRateThrottleMixin, UserRateThrottle):
+    pass
+
+
+class SharedAnonRateThrottle(SharedRateThrottleMixin, AnonRateThrottle):
+    pass
+
+
+class SharedScopedRateThrottle(SharedRateThrottleMixin, ScopedRateThrottle):
+    def allow_request(self, request, view):
+        # As ScopedRateThrottle: the rate depends on the view's throttle_scope, known only now
+        self.scope = getattr(view, self.scope_attr, None)
+        if not self.scope:
+            return True
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        return super().allow_request(request, view)